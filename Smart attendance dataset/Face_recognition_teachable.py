@@ -1,11 +1,26 @@
 import os
+import sys
 import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from keras.models import load_model
-from PIL import Image, ImageOps
+from preprocessing import BatchBuffer, collect_image_paths, preprocess_path
+from student_store import DB_PATH, StudentStore
+from attendance_log import compact
+from inference_backend import BACKENDS, load_backend
+from rule_engine import RuleEngine
+from prediction_cache import CACHE_PATH, PredictionCache, file_hash
 
 # === Load or create student database ===
 def load_student_database():
+    # The UI keeps students in SQLite; prefer it when present so both entry points agree
+    if os.path.exists(DB_PATH):
+        store = StudentStore(DB_PATH)
+        try:
+            compact(store)  # counters are derived from the attendance event log
+            return store.load_all()
+        finally:
+            store.close()
     if os.path.exists("student_database.json"):
         try:
             with open("student_database.json", "r") as f:
@@ -30,64 +45,186 @@ rules = [
     {"threshold": 5, "consequence": "Meeting with supervisor"},
     {"threshold": 7, "consequence": "Disciplinary action"}
 ]
+rule_engine = RuleEngine(rules)
 
 # === Load model ===
-if not os.path.exists("keras_model.h5"):
-    raise FileNotFoundError("Error: 'keras_model.h5' not found.")
-model = load_model("keras_model.h5", compile=False)
+def load_classifier(backend="keras", min_confidence=None):
+    # backend: "keras" (model.predict), "direct" (model(x)), "tflite[:path]" or "cascade[:path]" - see
+    # inference_backend.py; min_confidence also gates the cascade's escalation to the full model
+    return load_backend(backend, min_confidence=min_confidence)
 
 # === Load labels ===
-if not os.path.exists("labels.txt"):
-    raise FileNotFoundError("Error: 'labels.txt' not found.")
-with open("labels.txt", "r") as f:
-    class_names = [line.strip() for line in f.readlines()]
-
-# === Load captured image ===
-image_path = "Hemel31.jpg"
-if not os.path.exists(image_path):
-    raise FileNotFoundError(f"Error: '{image_path}' not found.")
-image = Image.open(image_path).convert("RGB")
-image = ImageOps.fit(image, (224, 224), Image.Resampling.LANCZOS)
-
-# === Preprocess image for prediction ===
-image_array = np.asarray(image).astype(np.float32)
-normalized_image_array = (image_array / 127.5) - 1
-data = np.ndarray(shape=(1, 224, 224, 3), dtype=np.float32)
-data[0] = normalized_image_array
-
-# === Perform prediction ===
-prediction = model.predict(data)
-top_index = np.argmax(prediction)
-max_confidence = prediction[0][top_index]
-min_confidence = 0.9750
-
-# === Process prediction result ===
-student_database = load_student_database()
-raw_label = class_names[top_index]
-predicted_name = " ".join(raw_label.split()[1:])  # Skip index (e.g., "0 Hemel" -> "Hemel")
-student = student_database.get(predicted_name)
+def load_class_names():
+    if not os.path.exists("labels.txt"):
+        raise FileNotFoundError("Error: 'labels.txt' not found.")
+    with open("labels.txt", "r") as f:
+        return [line.strip() for line in f.readlines()]
+
+def _load_batch(executor, batch_paths, buffer):
+    # Each worker decodes straight into its row of the batch buffer; failures are kept
+    # per image so one bad file doesn't stop the run. A one-shot run never reads a tensor
+    # twice, so nothing goes into the shared tensor cache.
+    def load(row, path):
+        try:
+            preprocess_path(path, buffer.data[row], cache=None)
+            return None
+        except Exception as e:
+            return str(e)
+    return list(executor.map(load, range(len(batch_paths)), batch_paths))
+
+# === Classify images in stacked batches, decoding the next batch while predicting ===
+def classify_images(model, image_paths, batch_size=32, workers=None):
+    batches = [image_paths[i:i + batch_size] for i in range(0, len(image_paths), batch_size)]
+    # Two buffers: one is being predicted while the other is filled
+    buffers = [BatchBuffer(batch_size), BatchBuffer(batch_size)]
+    with ThreadPoolExecutor(max_workers=workers) as executor, ThreadPoolExecutor(max_workers=1) as prefetcher:
+        pending = prefetcher.submit(_load_batch, executor, batches[0], buffers[0]) if batches else None
+        for index, batch_paths in enumerate(batches):
+            errors = pending.result()
+            if index + 1 < len(batches):
+                pending = prefetcher.submit(_load_batch, executor, batches[index + 1], buffers[(index + 1) % 2])
+
+            valid = [i for i, error in enumerate(errors) if error is None]
+            predictions = None
+            if valid:
+                data = buffers[index % 2].view(len(batch_paths))
+                if len(valid) < len(batch_paths):
+                    data = data[valid]
+                predictions = model.predict(data, batch_size=len(valid), verbose=0)
+
+            rows = {i: row for row, i in enumerate(valid)}
+            for i, path in enumerate(batch_paths):
+                if i in rows:
+                    yield path, predictions[rows[i]], None
+                else:
+                    yield path, None, errors[i]
+
+# === Skip files whose prediction is already cached ===
+def classify_images_cached(model, image_paths, cache, batch_size=32, workers=None):
+    # Same (path, prediction, error) stream and order as classify_images; only cache misses are predicted
+    keys = {}
+    for path in image_paths:
+        try:
+            keys[path] = file_hash(path)
+        except OSError:
+            pass  # reported by classify_images
+    cached = cache.get_many(keys.values())
+    misses = [path for path in image_paths if keys.get(path) not in cached]
+    fresh = classify_images(model, misses, batch_size, workers)
+    new_entries = []
+    for path in image_paths:
+        if keys.get(path) in cached:
+            yield path, cached[keys[path]], None
+            continue
+        path, prediction, error = next(fresh)
+        if error is None and path in keys:
+            new_entries.append((keys[path], prediction))
+            if len(new_entries) >= batch_size:
+                cache.put_many(new_entries)
+                new_entries = []
+        yield path, prediction, error
+    if new_entries:
+        cache.put_many(new_entries)
 
 # === Decision logic ===
-if max_confidence >= min_confidence and student:
-    student_id = student["id"]
-    absences = student["absences"]
-
-    # Find applicable consequence
-    consequence = next((rule["consequence"] for rule in rules if absences >= rule["threshold"]), "None")
-
-    result_text = (
-        f"Detected: {predicted_name}\n"
-        f"ID: {student_id}\n"
-        f"Absences: {absences}\n"
-        f"Confidence: {max_confidence:.2%}\n"
-        f"Consequence: {consequence}"
-    )
-else:
-    result_text = (
+def evaluate_prediction(prediction, class_names, student_database, min_confidence):
+    top_index = int(np.argmax(prediction))
+    return evaluate_top_class(top_index, float(prediction[top_index]), class_names, student_database, min_confidence)
+
+def evaluate_top_class(top_index, max_confidence, class_names, student_database, min_confidence):
+    raw_label = class_names[top_index]
+    predicted_name = " ".join(raw_label.split()[1:])  # Skip index (e.g., "0 Hemel" -> "Hemel")
+    student = student_database.get(predicted_name)
+
+    if max_confidence >= min_confidence and student:
+        absences = student["absences"]
+        # Highest rule reached (same as the UI)
+        consequence = rule_engine.consequence(absences)
+        return {
+            "name": predicted_name,
+            "id": student["id"],
+            "absences": absences,
+            "confidence": max_confidence,
+            "consequence": consequence
+        }
+    return {"name": "Unknown", "id": "", "absences": None, "confidence": max_confidence, "consequence": None}
+
+def format_result(result):
+    if result["name"] != "Unknown":
+        return (
+            f"Detected: {result['name']}\n"
+            f"ID: {result['id']}\n"
+            f"Absences: {result['absences']}\n"
+            f"Confidence: {result['confidence']:.2%}\n"
+            f"Consequence: {result['consequence']}"
+        )
+    return (
         "Unknown Person\n"
-        f"Confidence: {max_confidence:.2%}\n"
+        f"Confidence: {result['confidence']:.2%}\n"
         "No matching record found in student database."
     )
 
-# === Output the result ===
-print(result_text)
+def format_result_line(path, result):
+    if result["name"] != "Unknown":
+        return (f"{path}\t{result['name']}\tID: {result['id']}\tAbsences: {result['absences']}\t"
+                f"Confidence: {result['confidence']:.2%}\tConsequence: {result['consequence']}")
+    return f"{path}\tUnknown Person\tConfidence: {result['confidence']:.2%}"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Classify captured images with the Teachable Machine model.")
+    parser.add_argument("inputs", nargs="*", default=["Hemel31.jpg"],
+                        help="Image files, directories (e.g. test/) or glob patterns")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images per model.predict call")
+    parser.add_argument("--workers", type=int, default=None, help="Threads used to decode and preprocess images")
+    parser.add_argument("--min-confidence", type=float, default=0.9750)
+    parser.add_argument("--json", action="store_true", help="Print one JSON record per image")
+    parser.add_argument("--backend", default="keras",
+                        help=f"Inference backend: {', '.join(BACKENDS)} or tflite:<path> (default: keras)")
+    parser.add_argument("--cache", default=CACHE_PATH, help="Prediction cache database")
+    parser.add_argument("--no-cache", action="store_true", help="Always run the model")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.batch_size < 1:
+        raise SystemExit("Error: --batch-size must be at least 1.")
+
+    image_paths = collect_image_paths(args.inputs)
+    if not image_paths:
+        raise FileNotFoundError(f"Error: no images found in {', '.join(args.inputs)}.")
+    single_image = len(image_paths) == 1 and not os.path.isdir(args.inputs[0])
+    if single_image and not os.path.exists(image_paths[0]):
+        raise FileNotFoundError(f"Error: '{image_paths[0]}' not found.")
+
+    model = load_classifier(args.backend, args.min_confidence)
+    class_names = load_class_names()
+    student_database = load_student_database()
+
+    if args.no_cache:
+        results = classify_images(model, image_paths, args.batch_size, args.workers)
+    else:
+        cache = PredictionCache.for_model(args.backend, args.cache, min_confidence=args.min_confidence)
+        results = classify_images_cached(model, image_paths, cache, args.batch_size, args.workers)
+
+    for path, prediction, error in results:
+        if error is not None:
+            if args.json:
+                print(json.dumps({"path": path, "error": error}))
+            else:
+                print(f"{path}\tError: {error}", file=sys.stderr)
+            continue
+
+        result = evaluate_prediction(prediction, class_names, student_database, args.min_confidence)
+        # === Output the result ===
+        if args.json:
+            print(json.dumps({"path": path, **result}))
+        elif single_image:
+            print(format_result(result))
+        else:
+            print(format_result_line(path, result))
+
+    if hasattr(model, "format_stats"):
+        print(model.format_stats(), file=sys.stderr)  # cascade: share of images per stage
+
+if __name__ == "__main__":
+    main()
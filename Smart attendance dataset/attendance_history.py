@@ -0,0 +1,300 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from attendance_log import LOG_PATH, read_events
+from rule_engine import RuleEngine
+
+# === Columnar attendance history ===
+# attendance_events.jsonl replayed into parallel NumPy columns (one entry per
+# event: student code, day number, second of day, status code, confidence)
+# and cached in attendance_history.npz together with the log offset, so later
+# runs only parse the newly appended events. Events are kept sorted by
+# (day, student, time): a day range is one contiguous slice found with
+# np.searchsorted, and a CSR-style student index lists each student's events.
+# For the reports a student's day counts once; the last mark of the day wins.
+# Reports list every roster student, and absences stored in the student
+# database but absent from the log (seeded counts) count towards the rules.
+
+HISTORY_PATH = "attendance_history.npz"
+COLUMNS = ("student", "day", "second", "status", "confidence")
+EPOCH = np.datetime64("1970-01-01", "D")
+
+def parse_day(text):
+    # "YYYY-MM-DD" -> day number since 1970-01-01
+    return int((np.datetime64(text, "D") - EPOCH).astype(np.int64))
+
+def format_day(day):
+    return str(EPOCH + np.timedelta64(int(day), "D"))
+
+class AttendanceHistory:
+    def __init__(self):
+        self.names = []
+        self.ids = []
+        self.statuses = []
+        self.offset = 0  # bytes of the log already folded in
+        self.student = np.empty(0, dtype=np.int32)
+        self.day = np.empty(0, dtype=np.int32)
+        self.second = np.empty(0, dtype=np.int32)
+        self.status = np.empty(0, dtype=np.int8)
+        self.confidence = np.empty(0, dtype=np.float32)
+        self._codes = {}
+        self._status_codes = {}
+        self._build_indexes()
+
+    def __len__(self):
+        return len(self.day)
+
+    @classmethod
+    def load(cls, path=HISTORY_PATH):
+        history = cls()
+        if os.path.exists(path):
+            with np.load(path, allow_pickle=False) as data:
+                for column in COLUMNS:
+                    setattr(history, column, data[column])
+                history.names = data["names"].tolist()
+                history.ids = data["ids"].tolist()
+                history.statuses = data["statuses"].tolist()
+                history.offset = int(data["offset"])
+            history._codes = {name: code for code, name in enumerate(history.names)}
+            history._status_codes = {status: code for code, status in enumerate(history.statuses)}
+            history._build_indexes()
+        return history
+
+    def save(self, path=HISTORY_PATH):
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, names=np.array(self.names, dtype=str), ids=np.array(self.ids, dtype=str),
+                 statuses=np.array(self.statuses, dtype=str), offset=np.int64(self.offset),
+                 **{column: getattr(self, column) for column in COLUMNS})
+        os.replace(tmp_path, path)
+
+    def _code(self, name, student_id):
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+            self.ids.append("")
+        if student_id:
+            self.ids[code] = str(student_id)
+        return code
+
+    def _status_code(self, status):
+        code = self._status_codes.get(status)
+        if code is None:
+            code = self._status_codes[status] = len(self.statuses)
+            self.statuses.append(status)
+        return code
+
+    def update(self, log_path=LOG_PATH):
+        # Appends the events written since the last update; returns how many were added
+        if os.path.exists(log_path) and os.path.getsize(log_path) < self.offset:
+            raise ValueError(f"Error: {log_path} is shorter than the recorded history ({self.offset} bytes).")
+        students, statuses, times, confidences = [], [], [], []
+        end = self.offset
+        for event, end in read_events(log_path, self.offset):
+            students.append(self._code(event["name"], event.get("id")))
+            statuses.append(self._status_code(event["status"]))
+            times.append(event["time"].replace(" ", "T"))
+            confidence = event.get("confidence")
+            confidences.append(np.nan if confidence is None else confidence)
+        if not students:
+            return 0
+        stamps = np.array(times, dtype="datetime64[s]")
+        days = stamps.astype("datetime64[D]")
+        self.student = np.concatenate([self.student, np.array(students, dtype=np.int32)])
+        self.day = np.concatenate([self.day, (days - EPOCH).astype(np.int32)])
+        self.second = np.concatenate([self.second, (stamps - days).astype(np.int32)])
+        self.status = np.concatenate([self.status, np.array(statuses, dtype=np.int8)])
+        self.confidence = np.concatenate([self.confidence, np.array(confidences, dtype=np.float32)])
+        self.offset = end
+        order = np.lexsort((self.second, self.student, self.day))
+        for column in COLUMNS:
+            setattr(self, column, getattr(self, column)[order])
+        self._build_indexes()
+        return len(students)
+
+    def _build_indexes(self):
+        # Day index: distinct days and where each starts. Student index: event rows grouped by student.
+        self.days, self.day_starts = np.unique(self.day, return_index=True)
+        self.student_order = np.argsort(self.student, kind="stable")
+        counts = np.bincount(self.student, minlength=len(self.names))
+        self.student_starts = np.concatenate([[0], np.cumsum(counts)])
+
+    def day_slice(self, start=None, end=None):
+        # Rows for days start..end inclusive (day numbers; None = open-ended)
+        lo = 0 if start is None else int(np.searchsorted(self.day, start, side="left"))
+        hi = len(self.day) if end is None else int(np.searchsorted(self.day, end, side="right"))
+        return slice(lo, hi)
+
+    def student_rows(self, name):
+        code = self._codes.get(name)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return self.student_order[self.student_starts[code]:self.student_starts[code + 1]]
+
+    def daily_marks(self, rows=slice(None)):
+        # Last Present/Absent mark per (student, day) within rows -> (student, day, present) sorted by student, day
+        status = self.status[rows]
+        present, absent = self._status_codes.get("Present", -1), self._status_codes.get("Absent", -1)
+        keep = (status == present) | (status == absent)
+        student, day, present_mask = self.student[rows][keep], self.day[rows][keep], status[keep] == present
+        if not len(student):
+            return student, day, present_mask
+        # Rows are already in (day, student, time) order: the last row of each (day, student) group wins
+        last = np.ones(len(student), dtype=bool)
+        last[:-1] = (day[1:] != day[:-1]) | (student[1:] != student[:-1])
+        student, day, present_mask = student[last], day[last], present_mask[last]
+        order = np.lexsort((day, student))
+        return student[order], day[order], present_mask[order]
+
+def streaks(student, present, num_students):
+    # Longest present/absent run and the current (latest) run per student, over their marked days in order
+    longest_present = np.zeros(num_students, dtype=np.int64)
+    longest_absent = np.zeros(num_students, dtype=np.int64)
+    current = np.zeros(num_students, dtype=np.int64)  # > 0: present streak, < 0: absent streak
+    if not len(student):
+        return longest_present, longest_absent, current
+    breaks = np.flatnonzero((student[1:] != student[:-1]) | (present[1:] != present[:-1])) + 1
+    run_starts = np.concatenate([[0], breaks])
+    run_lengths = np.diff(np.concatenate([run_starts, [len(student)]]))
+    run_student, run_present = student[run_starts], present[run_starts]
+    np.maximum.at(longest_present, run_student[run_present], run_lengths[run_present])
+    np.maximum.at(longest_absent, run_student[~run_present], run_lengths[~run_present])
+    # Runs are in student order, so the last assignment per student is their latest run
+    current[run_student] = np.where(run_present, run_lengths, -run_lengths)
+    return longest_present, longest_absent, current
+
+def roster_columns(history, roster):
+    # Every history student plus roster students with no events yet; absences stored in the
+    # roster beyond the per-day absences term_report counts from the log (seeded counts) become
+    # each student's starting total, so the full-range total matches the stored count
+    names, ids = list(history.names), list(history.ids)
+    codes = {name: code for code, name in enumerate(names)}
+    for name, info in (roster or {}).items():
+        if name not in codes:
+            codes[name] = len(names)
+            names.append(name)
+            ids.append("")
+        if info.get("id") is not None:
+            ids[codes[name]] = str(info["id"])
+    seeded = np.zeros(len(names), dtype=np.int64)
+    if roster:
+        student, _, present = history.daily_marks()
+        logged = np.bincount(student[~present], minlength=len(names))
+        roster_codes = np.fromiter((codes[name] for name in roster), dtype=np.int64, count=len(roster))
+        stored = np.fromiter((int(info.get("absences", 0)) for info in roster.values()), dtype=np.int64,
+                             count=len(roster))
+        seeded[roster_codes] = np.maximum(stored - logged[roster_codes], 0)
+    return names, ids, seeded
+
+def term_report(history, engine, start=None, end=None, roster=None):
+    # roster: the student database ({name: {"id", "absences", ...}}), so that every student is
+    # listed and rule levels start from their stored absence count like the UI's
+    names, ids, seeded = roster_columns(history, roster)
+    num_students = len(names)
+    in_range = history.day_slice(start, end)
+    student, day, present = history.daily_marks(in_range)
+
+    present_days = np.bincount(student[present], minlength=num_students)
+    absent_days = np.bincount(student[~present], minlength=num_students)
+    marked_days = present_days + absent_days
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rates = present_days / marked_days
+    longest_present, longest_absent, current = streaks(student, present, num_students)
+
+    # Per-day turnout over the days that have any marks
+    days, day_codes = np.unique(day, return_inverse=True)
+    day_present = np.bincount(day_codes[present], minlength=len(days))
+    day_total = np.bincount(day_codes, minlength=len(days))
+
+    # Rule crossings: running absence total (absences before the range + within it) hitting a threshold
+    baseline = seeded.copy()
+    if start is not None:
+        before_student, _, before_present = history.daily_marks(history.day_slice(None, start - 1))
+        baseline += np.bincount(before_student[~before_present], minlength=num_students)
+    absent_student, absent_day = student[~present], day[~present]  # sorted by student, then day
+    group_starts = np.searchsorted(absent_student, absent_student, side="left")
+    running = baseline[absent_student] + np.arange(len(absent_student)) - group_starts + 1
+    crossed = np.isin(running, engine.thresholds)
+    levels = engine.levels(running[crossed])
+
+    students = [
+        {"name": names[i], "id": ids[i], "days": int(marked_days[i]),
+         "present": int(present_days[i]), "absent": int(absent_days[i]),
+         "rate": None if marked_days[i] == 0 else round(float(rates[i]), 4),
+         "longest_present_streak": int(longest_present[i]), "longest_absent_streak": int(longest_absent[i]),
+         "current_streak": int(current[i]),
+         "consequence": engine.consequence(baseline[i] + absent_days[i])}
+        for i in np.lexsort((np.array(names, dtype=str), np.nan_to_num(rates, nan=2.0)))
+    ]
+    turnout = [
+        {"day": format_day(d), "present": int(p), "marked": int(t), "turnout": round(float(p / t), 4)}
+        for d, p, t in zip(days, day_present, day_total)
+    ]
+    crossings = [
+        {"name": names[s], "id": ids[s], "day": format_day(d), "absences": int(n),
+         "consequence": engine.consequences[level]}
+        for s, d, n, level in zip(absent_student[crossed], absent_day[crossed], running[crossed], levels)
+    ]
+    crossings.sort(key=lambda row: (row["day"], row["name"]))
+    return {"students": students, "turnout": turnout, "crossings": crossings}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Attendance rates, streaks, turnout and rule crossings from the event log.")
+    parser.add_argument("--log", default=LOG_PATH)
+    parser.add_argument("--history", default=HISTORY_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="Fold new log events into the columnar history")
+    report = sub.add_parser("report", help="Term report for a date range")
+    report.add_argument("--from", dest="start", help="First day (YYYY-MM-DD)")
+    report.add_argument("--to", dest="end", help="Last day (YYYY-MM-DD)")
+    report.add_argument("--json", action="store_true", help="Print the whole report as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    history = AttendanceHistory.load(args.history)
+    try:
+        added = history.update(args.log)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    if added:
+        history.save(args.history)
+    if args.command == "build":
+        print(f"Added {added} event(s); {len(history)} event(s) for {len(history.names)} student(s) in {args.history}")
+        return
+
+    import Face_recognition_teachable as frt
+    try:
+        start = None if args.start is None else parse_day(args.start)
+        end = None if args.end is None else parse_day(args.end)
+    except ValueError:
+        print("Error: dates must be YYYY-MM-DD.", file=sys.stderr)
+        sys.exit(1)
+    started = time.perf_counter()
+    report = term_report(history, RuleEngine(frt.rules), start, end, frt.load_student_database())
+    elapsed = time.perf_counter() - started
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print("Students (lowest attendance first):")
+        for row in report["students"]:
+            rate = "n/a" if row["rate"] is None else f"{row['rate']:.1%}"
+            streak = f"{row['current_streak']} present" if row["current_streak"] >= 0 else f"{-row['current_streak']} absent"
+            print(f"{row['name']}\tID: {row['id']}\tRate: {rate} ({row['present']}/{row['days']})\t"
+                  f"Longest absent streak: {row['longest_absent_streak']}\tCurrent streak: {streak}\t"
+                  f"Consequence: {row['consequence']}")
+        print("\nTurnout per day:")
+        for row in report["turnout"]:
+            print(f"{row['day']}\t{row['present']}/{row['marked']}\t{row['turnout']:.1%}")
+        print("\nRule thresholds crossed:")
+        for row in report["crossings"]:
+            print(f"{row['day']}\t{row['name']}\tID: {row['id']}\tAbsences: {row['absences']}\t{row['consequence']}")
+    print(f"{len(report['students'])} student(s), {len(report['turnout'])} day(s), "
+          f"{len(report['crossings'])} crossing(s) in {elapsed * 1000:.0f} ms", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
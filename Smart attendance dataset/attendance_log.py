@@ -0,0 +1,163 @@
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+
+# === Append-only attendance event log ===
+# Every mark is one JSON line appended to attendance_events.jsonl (name, id,
+# status, timestamp, source, confidence, and the face box for group photos).
+# Appends are flushed immediately and fsync'ed in batches. The
+# absences/presences counters in the student store are a derived view:
+# compaction replays the events written since the last checkpoint and
+# applies them to the store together with the new log offset in a single
+# transaction, so a crash at any point never double-counts.
+
+LOG_PATH = "attendance_events.jsonl"
+OFFSET_KEY = "attendance_log_offset"
+STATUS_COUNTERS = {"Absent": "absences", "Present": "presences"}
+
+def make_event(name, student_id, status, source, confidence=None, timestamp=None, box=None):
+    event = {
+        "name": name,
+        "id": student_id,
+        "status": status,
+        "time": timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "source": source,
+        "confidence": None if confidence is None else round(float(confidence), 4)
+    }
+    if box is not None:
+        event["box"] = [int(v) for v in box]  # (x, y, w, h) of the face in the group photo
+    return event
+
+def repair_torn_tail(path):
+    # Drop a partial last line left by a crash mid-append, so new events start on a clean line
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b"\n":
+            return
+        size = f.tell()
+        chunk = min(size, 64 * 1024)
+        while True:
+            f.seek(size - chunk)
+            data = f.read(chunk)
+            cut = data.rfind(b"\n")
+            if cut >= 0 or chunk == size:
+                f.truncate(size - chunk + cut + 1 if cut >= 0 else 0)
+                return
+            chunk = min(size, chunk * 2)
+
+class AttendanceLog:
+    def __init__(self, path=LOG_PATH, fsync_every=16, fsync_interval=1.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        repair_torn_tail(path)
+        self.file = open(path, "ab")
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def append(self, event):
+        # Returns the number of bytes written
+        line = (json.dumps(event, separators=(",", ":")) + "\n").encode("utf-8")
+        self.file.write(line)
+        self.file.flush()
+        self.pending += 1
+        if self.pending >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+        return len(line)
+
+    def sync(self):
+        # Group commit: one fsync covers every event appended since the last one
+        if self.pending:
+            os.fsync(self.file.fileno())
+            self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def size(self):
+        return self.file.tell()
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+def read_events(path=LOG_PATH, offset=0):
+    # Yields (event, end_offset) for every complete line after offset; a torn final
+    # line (crash mid-append) is left for the next run
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        f.seek(offset)
+        position = offset
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            position += len(line)
+            if line.strip():
+                yield json.loads(line), position
+
+def count_events(events):
+    deltas = {}
+    for event in events:
+        counter = STATUS_COUNTERS.get(event["status"])
+        if counter:
+            student = deltas.setdefault(event["name"], {"absences": 0, "presences": 0})
+            student[counter] += 1
+    return deltas
+
+def compact(store, path=LOG_PATH):
+    # Fold the events written since the last checkpoint into the store's counters.
+    # The checkpoint is read under the write lock, so two processes compacting at
+    # once serialize and the second one finds nothing left to apply.
+    with store.batch(immediate=True):
+        offset = int(store.get_meta(OFFSET_KEY, 0))
+        if os.path.exists(path) and os.path.getsize(path) < offset:
+            raise ValueError(f"Error: {path} is shorter than the recorded checkpoint ({offset} bytes).")
+        end = offset
+        events = []
+        for event, end in read_events(path, offset):
+            events.append(event)
+        if end == offset:
+            return 0
+        store.add_counters(count_events(events))
+        store.set_meta(OFFSET_KEY, end)
+    return len(events)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Attendance event log tools.")
+    parser.add_argument("--log", default=LOG_PATH)
+    parser.add_argument("--db", default=None, help="SQLite student database (default: student_database.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("compact", help="Apply new events to the student counters")
+    history = sub.add_parser("history", help="Print the logged events")
+    history.add_argument("--name", help="Only events for this student")
+    history.add_argument("--date", help="Only events on this day (YYYY-MM-DD)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    from student_store import DB_PATH, StudentStore
+    args = parse_args(argv)
+
+    if args.command == "history":
+        for event, _ in read_events(args.log):
+            if args.name and event["name"] != args.name:
+                continue
+            if args.date and not event["time"].startswith(args.date):
+                continue
+            print(json.dumps(event))
+        return
+
+    store = StudentStore(args.db or DB_PATH)
+    try:
+        print(f"Compacted {compact(store, args.log)} event(s) into {store.path}")
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# === Per-session attendance indexes ===
+# Hash indexes that replace linear scans: the names already marked this
+# session (duplicate-mark check) and the student id -> name map (id
+# collision check). Both are kept in sync on every insert and delete, so
+# each check is O(1) regardless of roster or session size.
+
+class AttendanceSession:
+    def __init__(self, student_database=None):
+        self.records = []      # session records in marking order
+        self.marked = {}       # name -> record
+        self.names_by_id = {}  # student id -> name
+        for name, info in (student_database or {}).items():
+            self.names_by_id[str(info["id"])] = name
+
+    # --- marks ---
+    def is_marked(self, name):
+        return name in self.marked
+
+    def mark(self, record):
+        # Adds the record unless this student was already marked; returns False on duplicates
+        if record["name"] in self.marked:
+            return False
+        self.marked[record["name"]] = record
+        self.records.append(record)
+        return True
+
+    # --- roster ids ---
+    def id_taken(self, student_id):
+        return str(student_id) in self.names_by_id
+
+    def add_student(self, name, student_id):
+        self.names_by_id[str(student_id)] = name
+
+    def remove_student(self, name, student_id):
+        if self.names_by_id.get(str(student_id)) == name:
+            del self.names_by_id[str(student_id)]
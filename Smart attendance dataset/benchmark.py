@@ -0,0 +1,287 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from datetime import datetime
+import numpy as np
+from inference_backend import MODEL_PATH, expected_label, load_backend, model_fingerprint
+from preprocessing import BatchBuffer, collect_image_paths, open_image, preprocess_image
+
+# === Benchmark suite ===
+# Repeatable latency/throughput/accuracy numbers on the bundled dataset:
+#   decode / preprocess time per image, model load, cold vs warm predict,
+#   p50/p95/p99 end-to-end latency (decode + preprocess + predict, batch 1),
+#   throughput at several batch sizes, and top-1 accuracy / false-accept rate
+#   at each min_confidence threshold on test/ (unknowns such as iryn.jpg,
+#   Chanman.jpg and Iman.jpg must be rejected) and, separately, on the
+#   train/<Name>/ photos. --roster-rows N also times a synthetic N-row CSV
+#   roster import into a scratch SQLite store (wall time and peak memory).
+# Results are written as one JSON document; --baseline compares against an
+# earlier run and exits non-zero when a metric regresses past --tolerance.
+
+# metric path -> True when higher is better
+TRACKED_METRICS = {
+    ("decode_ms", "p50"): False,
+    ("preprocess_ms", "p50"): False,
+    ("predict_warm_ms", "p50"): False,
+    ("end_to_end_ms", "p50"): False,
+    ("end_to_end_ms", "p95"): False,
+    ("end_to_end_ms", "p99"): False,
+    ("roster_import", "seconds"): False,
+}
+
+def percentiles(samples_ms):
+    samples = np.asarray(samples_ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {"mean": float(samples.mean()), "p50": float(p50), "p95": float(p95), "p99": float(p99), "n": len(samples)}
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def time_stages(image_paths, repeats):
+    # Decode and preprocess timed separately, without the tensor cache
+    decode, preprocess = [], []
+    out = np.empty((224, 224, 3), dtype=np.float32)
+    for _ in range(repeats):
+        for path in image_paths:
+            started = time.perf_counter()
+            image = open_image(path)
+            decoded = time.perf_counter()
+            preprocess_image(image, out)
+            finished = time.perf_counter()
+            decode.append((decoded - started) * 1000)
+            preprocess.append((finished - decoded) * 1000)
+    return percentiles(decode), percentiles(preprocess)
+
+def time_end_to_end(model, image_paths, repeats):
+    buffer = BatchBuffer(1)
+    samples, predictions = [], {}
+    for _ in range(repeats):
+        for path in image_paths:
+            started = time.perf_counter()
+            preprocess_image(open_image(path), buffer.data[0])
+            predictions[path] = model.predict(buffer.data, batch_size=1, verbose=0)[0]
+            samples.append((time.perf_counter() - started) * 1000)
+    return percentiles(samples), predictions
+
+def time_throughput(model, tensors, batch_sizes, min_seconds):
+    # Images/second on preprocessed tensors, so only the model is measured
+    results = {}
+    for batch_size in batch_sizes:
+        batch = np.resize(tensors, (batch_size,) + tensors.shape[1:])  # repeats images when batch > dataset
+        model.predict(batch, batch_size=batch_size, verbose=0)  # warm up this shape
+        images, started = 0, time.perf_counter()
+        while time.perf_counter() - started < min_seconds:
+            model.predict(batch, batch_size=batch_size, verbose=0)
+            images += batch_size
+        results[str(batch_size)] = images / (time.perf_counter() - started)
+    return results
+
+def time_roster_import(rows):
+    # Wall time from an untraced run; peak Python memory from a second, traced run
+    # (tracemalloc slows the import down several times, so it isn't timed)
+    import csv
+    import tempfile
+    import tracemalloc
+    from student_store import StudentStore
+    with tempfile.TemporaryDirectory() as directory:
+        roster = os.path.join(directory, "roster.csv")
+        with open(roster, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "id", "absences", "presences"])
+            writer.writerows((f"Student{i}", str(100000 + i), i % 9, i % 20) for i in range(rows))
+        results = {"rows": rows}
+        for traced in (False, True):
+            store = StudentStore(os.path.join(directory, f"students_{int(traced)}.db"))
+            try:
+                if traced:
+                    tracemalloc.start()
+                started = time.perf_counter()
+                store.import_roster(roster)
+                elapsed = time.perf_counter() - started
+                if traced:
+                    results["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+                    tracemalloc.stop()
+                else:
+                    results["seconds"] = elapsed
+                    results["rows_per_s"] = rows / elapsed
+            finally:
+                store.close()
+        return results
+
+def accuracy_metrics(predictions, class_names, thresholds, labels=None):
+    # top-1 accuracy over known students; false accepts are unknown people given a name.
+    # labels: {path: expected name}; defaults to the test/ file naming (Abir31.jpg -> Abir)
+    if labels is None:
+        labels = {path: expected_label(path, class_names) for path in predictions}
+    known = [(p, labels[path]) for path, p in predictions.items() if labels[path] != "Unknown"]
+    unknown = [p for path, p in predictions.items() if labels[path] == "Unknown"]
+    metrics = {"known_images": len(known), "unknown_images": len(unknown)}
+    if known:
+        metrics["top1_accuracy"] = float(np.mean([class_names[int(np.argmax(p))] == label for p, label in known]))
+    for threshold in thresholds:
+        key = f"{threshold:g}"
+        if known:
+            metrics[f"accuracy@{key}"] = float(np.mean(
+                [class_names[int(np.argmax(p))] == label and p.max() >= threshold for p, label in known]))
+        if unknown:
+            metrics[f"false_accept_rate@{key}"] = float(np.mean([p.max() >= threshold for p in unknown]))
+    return metrics
+
+def predict_paths(model, paths, batch_size=32):
+    # Untimed batched predictions for the accuracy passes
+    buffer = BatchBuffer(batch_size)
+    predictions = {}
+    for start in range(0, len(paths), batch_size):
+        chunk = paths[start:start + batch_size]
+        for row, path in enumerate(chunk):
+            preprocess_image(open_image(path), buffer.data[row])
+        for path, prediction in zip(chunk, model.predict(buffer.view(len(chunk)), batch_size=len(chunk), verbose=0)):
+            predictions[path] = np.asarray(prediction)
+    return predictions
+
+def run(args):
+    with open("labels.txt", "r") as f:
+        class_names = [line.strip().split(" ", 1)[-1].strip() for line in f]
+    test_paths = collect_image_paths([args.test_dir])
+    train_paths = [path for name in sorted(os.listdir(args.train_dir))
+                   for path in collect_image_paths([os.path.join(args.train_dir, name)])
+                   if os.path.isdir(os.path.join(args.train_dir, name))]
+    if not test_paths:
+        raise FileNotFoundError(f"Error: no images found in {args.test_dir}.")
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "backend": args.backend,
+        "model_fingerprint": model_fingerprint(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "images": {"train": len(train_paths), "test": len(test_paths)},
+    }
+
+    stage_paths = (train_paths + test_paths)[:args.stage_images]
+    report["decode_ms"], report["preprocess_ms"] = time_stages(stage_paths, args.repeats)
+
+    started = time.perf_counter()
+    model = load_backend(args.backend, MODEL_PATH, args.threads)
+    report["model_load_s"] = time.perf_counter() - started
+
+    sample = BatchBuffer(1)
+    preprocess_image(open_image(test_paths[0]), sample.data[0])
+    started = time.perf_counter()
+    model.predict(sample.data, batch_size=1, verbose=0)
+    report["predict_cold_ms"] = (time.perf_counter() - started) * 1000
+    warm = []
+    for _ in range(max(10, args.repeats * 10)):
+        started = time.perf_counter()
+        model.predict(sample.data, batch_size=1, verbose=0)
+        warm.append((time.perf_counter() - started) * 1000)
+    report["predict_warm_ms"] = percentiles(warm)
+
+    report["end_to_end_ms"], predictions = time_end_to_end(model, test_paths, args.repeats)
+
+    tensors = BatchBuffer(len(test_paths))
+    for row, path in enumerate(test_paths):
+        preprocess_image(open_image(path), tensors.data[row])
+    report["throughput_images_per_s"] = time_throughput(model, tensors.data, args.batch_sizes, args.min_seconds)
+    report["accuracy"] = accuracy_metrics(predictions, class_names, args.thresholds)
+    if train_paths:
+        train_labels = {path: os.path.basename(os.path.dirname(path)) for path in train_paths}
+        train_labels = {path: name if name in class_names else "Unknown" for path, name in train_labels.items()}
+        report["train_accuracy"] = accuracy_metrics(predict_paths(model, train_paths), class_names,
+                                                    args.thresholds, train_labels)
+    if args.roster_rows:
+        report["roster_import"] = time_roster_import(args.roster_rows)
+    return report
+
+def lookup(report, path):
+    value = report
+    for part in path:
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+def compare_reports(current, baseline, tolerance):
+    # Relative change per tracked metric; regressions are moves in the bad direction past the tolerance
+    metrics = dict(TRACKED_METRICS)
+    for key in current.get("throughput_images_per_s", {}):
+        metrics[("throughput_images_per_s", key)] = True
+    for section in ("accuracy", "train_accuracy"):
+        for key in current.get(section, {}):
+            if key.startswith(("top1", "accuracy@")):
+                metrics[(section, key)] = True
+            elif key.startswith("false_accept"):
+                metrics[(section, key)] = False
+
+    rows, regressions = [], []
+    for metric, higher_is_better in metrics.items():
+        new, old = lookup(current, metric), lookup(baseline, metric)
+        if new is None or old is None:
+            continue
+        if metric[0] in ("accuracy", "train_accuracy"):
+            change = new - old  # absolute for rates
+            worse = -change if higher_is_better else change
+            limit = tolerance / 10
+        else:
+            change = (new - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            limit = tolerance
+        name = ".".join(metric)
+        rows.append((name, old, new, change))
+        if worse > limit:
+            regressions.append(name)
+    return rows, regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark recognition latency, throughput and accuracy.")
+    parser.add_argument("--backend", default="keras", help="keras, direct, tflite or tflite:<path>")
+    parser.add_argument("--threads", type=int, default=None, help="TFLite interpreter threads")
+    parser.add_argument("--train-dir", default="train")
+    parser.add_argument("--test-dir", default="test")
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the images for latency samples")
+    parser.add_argument("--stage-images", type=int, default=64, help="Images used for decode/preprocess timing")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="Minimum timing window per batch size")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.95, 0.975])
+    parser.add_argument("--roster-rows", type=int, default=0, help="Also time importing a synthetic roster of this size")
+    parser.add_argument("--output", default=None, help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="Earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed relative slowdown (accuracy/false-accept rates: tolerance / 10 absolute)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    document = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if baseline.get("model_fingerprint") != report["model_fingerprint"]:
+            print("Warning: baseline was produced with a different model.", file=sys.stderr)
+        rows, regressions = compare_reports(report, baseline, args.tolerance)
+        for metric, old, new, change in rows:
+            flag = "  REGRESSION" if metric in regressions else ""
+            print(f"{metric:<40} {old:>12.4f} -> {new:>12.4f} ({change:+.1%}){flag}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
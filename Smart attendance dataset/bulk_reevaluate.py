@@ -0,0 +1,278 @@
+import os
+import sys
+import csv
+import time
+import queue
+import argparse
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from attendance_log import repair_torn_tail
+from preprocessing import IMAGE_EXTENSIONS, INPUT_SIZE, preprocess_path
+
+# === Bulk re-evaluation of the photo archive ===
+# Decoding/preprocessing is spread over a process pool that writes straight
+# into shared-memory batch buffers ("slots"); a small number of inference
+# processes (each with tuned TensorFlow intra/inter-op threads) read those
+# slots and predict. Results are streamed to a CSV file, flushed per batch,
+# so an interrupted run resumes by skipping every path already written.
+
+CSV_FIELDS = ["path", "label", "predicted", "confidence", "correct", "error"]
+POLL_SECONDS = 0.5  # how often blocked waits re-check for failed workers
+
+def archive_images(roots):
+    # (path, label) for every image; label is the train/<Name>/ folder, None for loose files
+    images = []
+    for root in roots:
+        if os.path.isfile(root):
+            images.append((root, None))
+            continue
+        for folder, dirs, files in os.walk(root):
+            dirs.sort()
+            label = os.path.basename(folder) if os.path.abspath(folder) != os.path.abspath(root) else None
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    images.append((os.path.join(folder, name), label))
+    return images
+
+def completed_paths(output_path):
+    # Paths already written to the output CSV; None when there is nothing to resume from
+    # (no file, an empty file or a torn header), so the run starts the file afresh
+    if not os.path.exists(output_path):
+        return None
+    repair_torn_tail(output_path)  # a run killed mid-row leaves a partial last line
+    with open(output_path, newline="") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames != CSV_FIELDS:
+            return None
+        return {row["path"] for row in reader}
+
+def read_class_names(labels_path="labels.txt"):
+    with open(labels_path, "r") as f:
+        return [line.strip().split(" ", 1)[-1].strip() for line in f]
+
+def slot_view(shm, batch_size):
+    return np.ndarray((batch_size, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32, buffer=shm.buf)
+
+# --- decode workers ---
+_decoder_slots = {}
+
+def _attach_slots(slot_names, batch_size):
+    for name in slot_names:
+        shm = shared_memory.SharedMemory(name=name)
+        _decoder_slots[name] = (shm, slot_view(shm, batch_size))
+
+def decode_batch(slot_name, paths):
+    # Runs in a decode process: fills the slot's rows and returns per-image errors
+    _, data = _decoder_slots[slot_name]
+    errors = []
+    for row, path in enumerate(paths):
+        try:
+            preprocess_path(path, data[row], cache=None)
+            errors.append(None)
+        except Exception as e:
+            errors.append(str(e))
+    return errors
+
+# --- inference workers ---
+def inference_worker(tasks, results, slot_names, batch_size, intra_threads, inter_threads, backend, min_confidence):
+    try:
+        if backend.split(":", 1)[0] in ("keras", "direct"):
+            import tensorflow as tf
+            tf.config.threading.set_intra_op_parallelism_threads(intra_threads)
+            tf.config.threading.set_inter_op_parallelism_threads(inter_threads)
+        from inference_backend import load_backend
+        model = load_backend(backend, num_threads=intra_threads, min_confidence=min_confidence)
+    except Exception as e:
+        # Tell the parent instead of dying silently; it aborts the run
+        results.put(("error", f"inference worker could not load backend '{backend}': {e}"))
+        return
+
+    slots = {}
+    for name in slot_names:
+        shm = shared_memory.SharedMemory(name=name)
+        slots[name] = (shm, slot_view(shm, batch_size))
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            slot_name, paths, errors = task
+            valid = [i for i, error in enumerate(errors) if error is None]
+            top, confidence = np.zeros(len(paths), dtype=np.int64), np.zeros(len(paths), dtype=np.float32)
+            if valid:
+                data = slots[slot_name][1][:len(paths)]
+                predictions = model.predict(data[valid] if len(valid) < len(paths) else data,
+                                            batch_size=len(valid), verbose=0)
+                top[valid] = np.argmax(predictions, axis=1)
+                confidence[valid] = predictions[np.arange(len(valid)), top[valid]]
+            results.put((slot_name, paths, errors, top, confidence))
+    except Exception as e:
+        results.put(("error", f"inference worker failed: {e}"))
+    finally:
+        for shm, _ in slots.values():
+            shm.close()
+
+def run(args):
+    images = archive_images(args.roots)
+    done = None if args.restart else completed_paths(args.output)
+    todo = [(path, label) for path, label in images if path not in (done or ())]
+    print(f"{len(images)} image(s), {len(images) - len(todo)} already done, {len(todo)} to evaluate", file=sys.stderr)
+    if not todo:
+        return
+
+    class_names = read_class_names()
+    batches = [todo[i:i + args.batch_size] for i in range(0, len(todo), args.batch_size)]
+    labels = {path: label for path, label in todo}
+
+    cpus = os.cpu_count() or 2
+    decoders = args.decoders or max(1, cpus - args.inference_workers)
+    intra = args.intra_threads or max(1, cpus // args.inference_workers)
+    slot_count = args.slots or 2 * (decoders + args.inference_workers)
+    slot_bytes = args.batch_size * INPUT_SIZE[0] * INPUT_SIZE[1] * 3 * 4
+    slots = []
+    try:
+        for _ in range(slot_count):
+            slots.append(shared_memory.SharedMemory(create=True, size=slot_bytes))
+        return _run(args, batches, labels, class_names, decoders, intra, slots, new_file=done is None)
+    finally:
+        for shm in slots:
+            shm.close()
+            shm.unlink()
+
+def _run(args, batches, labels, class_names, decoders, intra, slots, new_file):
+    slot_names = [shm.name for shm in slots]
+    ctx = mp.get_context("spawn")  # keep TensorFlow state out of forked children
+    free_slots = ctx.Queue()
+    for name in slot_names:
+        free_slots.put(name)
+    tasks, results = ctx.Queue(), ctx.Queue()
+    workers = [
+        ctx.Process(target=inference_worker,
+                    args=(tasks, results, slot_names, args.batch_size, intra, args.inter_threads, args.backend,
+                          args.min_confidence),
+                    daemon=True)
+        for _ in range(args.inference_workers)
+    ]
+    for worker in workers:
+        worker.start()
+
+    output = open(args.output, "w" if new_file else "a", newline="")
+    writer = csv.DictWriter(output, fieldnames=CSV_FIELDS)
+    if new_file:
+        writer.writeheader()
+
+    stats = {"written": 0, "correct": 0, "labelled": 0}
+    failure = []  # first error that aborts the run
+    finished = threading.Event()
+
+    def check_workers():
+        # Workers only exit after the final sentinel, so any exit before that loses batches
+        dead = [worker for worker in workers if not worker.is_alive()]
+        if dead and not failure:
+            failure.append(f"inference worker exited unexpectedly (exit code {dead[0].exitcode})")
+
+    def write_results():
+        # Streams each finished batch to the CSV and hands its slot back
+        try:
+            _write_results()
+        except Exception as e:
+            failure.append(f"writing {args.output} failed: {e}")
+        finally:
+            finished.set()
+
+    def _write_results():
+        remaining = len(batches)
+        while remaining and not failure:
+            try:
+                result = results.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                check_workers()
+                continue
+            if result[0] == "error":
+                failure.append(result[1])
+                break
+            slot_name, paths, errors, top, confidence = result
+            for i, path in enumerate(paths):
+                label = labels[path]
+                row = {"path": path, "label": label or "", "error": errors[i] or ""}
+                if errors[i] is None:
+                    predicted = class_names[top[i]] if confidence[i] >= args.min_confidence else "Unknown"
+                    row.update(predicted=predicted, confidence=f"{confidence[i]:.4f}")
+                    if label:
+                        row["correct"] = int(predicted == label)
+                        stats["correct"] += row["correct"]
+                        stats["labelled"] += 1
+                writer.writerow(row)
+            output.flush()
+            stats["written"] += len(paths)
+            remaining -= 1
+            free_slots.put(slot_name)
+
+    def decode_failed(error):
+        failure.append(f"decode worker failed: {error}")
+
+    started = time.perf_counter()
+    writer_thread = threading.Thread(target=write_results, daemon=True)
+    writer_thread.start()
+    try:
+        with ctx.Pool(decoders, initializer=_attach_slots, initargs=(slot_names, args.batch_size)) as pool:
+            for batch in batches:
+                slot_name = None
+                while slot_name is None and not failure:
+                    try:
+                        slot_name = free_slots.get(timeout=POLL_SECONDS)
+                    except queue.Empty:
+                        pass
+                if failure:
+                    break
+                paths = [path for path, _ in batch]
+                pool.apply_async(decode_batch, (slot_name, paths),
+                                 callback=lambda errors, s=slot_name, p=paths: tasks.put((s, p, errors)),
+                                 error_callback=decode_failed)
+            # Leaving the block terminates the pool, so wait for the writer first
+            while not finished.wait(POLL_SECONDS):
+                pass
+    finally:
+        for _ in workers:
+            tasks.put(None)
+        for worker in workers:
+            worker.join(10)
+            if worker.is_alive():
+                worker.terminate()
+        output.close()
+    if failure:
+        raise RuntimeError(f"Error: {failure[0]}; {stats['written']} image(s) written to {args.output} "
+                           f"before the run stopped (rerun to resume).")
+
+    elapsed = time.perf_counter() - started
+    accuracy = f", top-1 accuracy {stats['correct'] / stats['labelled']:.2%}" if stats["labelled"] else ""
+    print(f"Evaluated {stats['written']} image(s) in {elapsed:.1f}s "
+          f"({stats['written'] / elapsed:.1f} img/s){accuracy} -> {args.output}", file=sys.stderr)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Re-classify the photo archive after retraining.")
+    parser.add_argument("roots", nargs="*", default=["train", "test"], help="Folders or images to evaluate")
+    parser.add_argument("--output", default="reevaluation.csv")
+    parser.add_argument("--restart", action="store_true", help="Ignore existing output instead of resuming")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--decoders", type=int, default=None, help="Decode processes (default: CPUs - inference workers)")
+    parser.add_argument("--inference-workers", type=int, default=1)
+    parser.add_argument("--intra-threads", type=int, default=None, help="TensorFlow intra-op threads per inference worker")
+    parser.add_argument("--inter-threads", type=int, default=1, help="TensorFlow inter-op threads per inference worker")
+    parser.add_argument("--slots", type=int, default=None, help="Shared-memory batch buffers in flight")
+    parser.add_argument("--min-confidence", type=float, default=0.9750)
+    parser.add_argument("--backend", default="keras", help="keras, direct, tflite[:path] or cascade[:first stage]")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    try:
+        run(parse_args(argv))
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
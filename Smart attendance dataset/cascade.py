@@ -0,0 +1,136 @@
+import sys
+import json
+import time
+import argparse
+import threading
+import numpy as np
+from inference_backend import expected_label, load_backend
+from preprocessing import BatchBuffer, collect_image_paths, preprocess_path
+
+# === Confidence-gated cascade ===
+# A cheap first stage (by default the int8 TFLite export) answers every image
+# whose top-1 probability clears min_confidence with at least `margin` over the
+# runner-up. Only the remaining, ambiguous images are re-run through the full
+# keras_model.h5. Like the other backends it exposes predict(), so the CLI,
+# UI and tools can use it with --backend cascade[:<first stage backend>].
+
+DEFAULT_FAST_BACKEND = "tflite:keras_model_int8.tflite"
+DEFAULT_MIN_CONFIDENCE = 0.975
+DEFAULT_MARGIN = 0.5
+
+class Cascade:
+    def __init__(self, fast, full, min_confidence=DEFAULT_MIN_CONFIDENCE, margin=DEFAULT_MARGIN):
+        self.fast = fast
+        self.full = full
+        self.min_confidence = min_confidence
+        self.margin = margin
+        self.lock = threading.Lock()
+        self.images = 0
+        self.escalated = 0
+        self.fast_seconds = 0.0
+        self.full_seconds = 0.0
+
+    @property
+    def keras_model(self):
+        return getattr(self.full, "keras_model", self.full)
+
+    def accepts(self, predictions):
+        # True where the first stage is confident enough to answer on its own
+        top2 = np.sort(predictions, axis=1)[:, -2:]
+        return (top2[:, 1] >= self.min_confidence) & (top2[:, 1] - top2[:, 0] >= self.margin)
+
+    def predict(self, batch, batch_size=None, verbose=0):
+        started = time.perf_counter()
+        predictions = np.array(self.fast.predict(batch, batch_size=len(batch), verbose=0), dtype=np.float32)
+        fast_seconds = time.perf_counter() - started
+        uncertain = np.flatnonzero(~self.accepts(predictions))
+        full_seconds = 0.0
+        if len(uncertain):
+            started = time.perf_counter()
+            subset = batch if len(uncertain) == len(batch) else batch[uncertain]
+            predictions[uncertain] = self.full.predict(subset, batch_size=len(uncertain), verbose=0)
+            full_seconds = time.perf_counter() - started
+        with self.lock:
+            self.images += len(batch)
+            self.escalated += len(uncertain)
+            self.fast_seconds += fast_seconds
+            self.full_seconds += full_seconds
+        return predictions
+
+    def stats(self):
+        with self.lock:
+            answered_fast = self.images - self.escalated
+            full_per_image = self.full_seconds / self.escalated if self.escalated else None
+            stats = {
+                "images": self.images,
+                "fast_stage_fraction": answered_fast / self.images if self.images else 0.0,
+                "full_stage_fraction": self.escalated / self.images if self.images else 0.0,
+                "seconds": self.fast_seconds + self.full_seconds,
+            }
+            if full_per_image is not None and self.images:
+                # Estimated full-model-only cost, from the measured per-image cost of stage 2
+                baseline = full_per_image * self.images
+                stats["estimated_full_only_seconds"] = baseline
+                stats["estimated_savings"] = 1 - stats["seconds"] / baseline
+            return stats
+
+    def format_stats(self):
+        stats = self.stats()
+        line = (f"Cascade: {stats['images']} image(s), {stats['fast_stage_fraction']:.1%} answered by the first stage, "
+                f"{stats['full_stage_fraction']:.1%} by the full model, {stats['seconds'] * 1000:.0f} ms total")
+        if "estimated_savings" in stats:
+            line += f" ({stats['estimated_savings']:.1%} faster than full model only, est.)"
+        return line
+
+def load_cascade(fast_backend=DEFAULT_FAST_BACKEND, full_backend="direct", min_confidence=DEFAULT_MIN_CONFIDENCE,
+                 margin=DEFAULT_MARGIN):
+    return Cascade(load_backend(fast_backend), load_backend(full_backend), min_confidence, margin)
+
+def run_comparison(args):
+    # Batch-1 accuracy and latency: full model alone vs the cascade, on the same images
+    with open("labels.txt", "r") as f:
+        class_names = [line.strip().split(" ", 1)[-1].strip() for line in f]
+    image_paths = collect_image_paths(args.inputs)
+    if not image_paths:
+        raise FileNotFoundError(f"Error: no images found in {', '.join(args.inputs)}.")
+    cascade = load_cascade(args.fast, args.full, args.min_confidence, args.margin)
+    buffer = BatchBuffer(1)
+    for model in (cascade.fast, cascade.full):
+        model.predict(np.zeros(buffer.data.shape, dtype=np.float32), verbose=0)  # warm-up
+
+    results = {}
+    for name, model in (("full", cascade.full), ("cascade", cascade)):
+        correct, seconds = 0, 0.0
+        for path in image_paths:
+            preprocess_path(path, buffer.data[0])
+            started = time.perf_counter()
+            prediction = model.predict(buffer.data, batch_size=1, verbose=0)[0]
+            seconds += time.perf_counter() - started
+            top_index = int(np.argmax(prediction))
+            predicted = class_names[top_index] if prediction[top_index] >= args.min_confidence else "Unknown"
+            correct += predicted == expected_label(path, class_names)
+        results[name] = {"accuracy": correct / len(image_paths), "mean_ms": seconds / len(image_paths) * 1000}
+    results["cascade"].update(cascade.stats())
+    results["latency_savings"] = 1 - results["cascade"]["mean_ms"] / results["full"]["mean_ms"]
+    return results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the confidence-gated cascade against the full model.")
+    parser.add_argument("inputs", nargs="*", default=["test"])
+    parser.add_argument("--fast", default=DEFAULT_FAST_BACKEND, help="First stage backend")
+    parser.add_argument("--full", default="direct", help="Second stage backend")
+    parser.add_argument("--min-confidence", type=float, default=0.9750)
+    parser.add_argument("--margin", type=float, default=0.5, help="Required top-1 minus top-2 probability")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        results = run_comparison(args)
+    except (FileNotFoundError, ValueError) as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import os
+import json
+import argparse
+import numpy as np
+from preprocessing import IMAGE_EXTENSIONS, load_batch
+
+# === Embedding-based student identification ===
+# Uses the existing keras_model.h5 as a feature extractor (the features that
+# feed the final softmax layer) and keeps one L2-normalized centroid per
+# student in a compact float32 matrix. Identification is a single matrix
+# product (cosine similarity), and enrolling a student only needs a few
+# images - no retraining of the Teachable Machine model.
+
+INDEX_PATH = "embedding_index.npz"
+
+def build_feature_extractor(model):
+    from keras.models import Model, Sequential
+    model = getattr(model, "keras_model", model)  # direct/tflite backends wrap the Keras model
+    layers = model.layers
+    if len(layers) > 1 and hasattr(layers[-1], "layers"):
+        # Teachable Machine export: [backbone Sequential, head Sequential] - keep the backbone
+        return layers[0] if len(layers) == 2 else Sequential(layers[:-1])
+    return Model(inputs=model.inputs, outputs=layers[-2].output)
+
+def load_image_batch(image_paths):
+    # Same preprocessing as the classifier (shared preprocessing module)
+    return load_batch(image_paths)
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def extract_embeddings(feature_extractor, batch, batch_size=32):
+    return normalize_rows(feature_extractor.predict(batch, batch_size=batch_size, verbose=0))
+
+class EmbeddingIndex:
+    def __init__(self, names=None, sums=None, counts=None):
+        # sums holds the running sum of each student's normalized embeddings so
+        # further enrollment images can be folded in without keeping the originals
+        self.names = list(names or [])
+        self.sums = np.asarray(sums, dtype=np.float32) if sums is not None else None
+        self.counts = np.asarray(counts, dtype=np.int32) if counts is not None else np.zeros(0, dtype=np.int32)
+        self.rows = {name: row for row, name in enumerate(self.names)}
+        self.centroids = normalize_rows(self.sums) if self.sums is not None else None
+        self.ann = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def enroll(self, name, embeddings):
+        embeddings = normalize_rows(embeddings)
+        total = embeddings.sum(axis=0)
+        if self.sums is None:
+            self.sums = np.zeros((0, total.shape[0]), dtype=np.float32)
+        if name in self.rows:
+            row = self.rows[name]
+            self.sums[row] += total
+            self.counts[row] += len(embeddings)
+            self.centroids[row] = normalize_rows(self.sums[row:row + 1])[0]
+        else:
+            self.rows[name] = len(self.names)
+            self.names.append(name)
+            self.sums = np.vstack([self.sums, total[None, :]])
+            self.counts = np.append(self.counts, np.int32(len(embeddings)))
+            self.centroids = normalize_rows(self.sums)
+        self.ann = None
+
+    def remove(self, name):
+        row = self.rows.pop(name, None)
+        if row is None:
+            return False
+        del self.names[row]
+        self.sums = np.delete(self.sums, row, axis=0)
+        self.counts = np.delete(self.counts, row)
+        self.centroids = np.delete(self.centroids, row, axis=0)
+        self.rows = {name: row for row, name in enumerate(self.names)}
+        self.ann = None
+        return True
+
+    def build_ann(self):
+        # Optional approximate nearest-neighbor index for very large rosters (requires faiss)
+        try:
+            import faiss
+        except ImportError:
+            raise ImportError("Error: the approximate index requires the 'faiss-cpu' package.")
+        self.ann = faiss.IndexHNSWFlat(self.centroids.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+        self.ann.add(self.centroids)
+
+    def search(self, embeddings):
+        # Returns (names, similarities) of the closest centroid for every query row
+        queries = normalize_rows(embeddings)
+        if not self.names:
+            return ["Unknown"] * len(queries), np.zeros(len(queries), dtype=np.float32)
+        if self.ann is not None:
+            similarities, rows = self.ann.search(queries, 1)
+            rows, similarities = rows[:, 0], similarities[:, 0]
+        else:
+            scores = queries @ self.centroids.T
+            rows = np.argmax(scores, axis=1)
+            similarities = scores[np.arange(len(queries)), rows]
+        return [self.names[row] for row in rows], similarities
+
+    def identify(self, embeddings, threshold):
+        names, similarities = self.search(embeddings)
+        return [(name if similarity >= threshold else "Unknown", float(similarity))
+                for name, similarity in zip(names, similarities)]
+
+    def save(self, path=INDEX_PATH):
+        # Write to a temp file and swap, so a crash never leaves a half-written index
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, names=np.array(self.names), sums=self.sums, counts=self.counts)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            return cls(names=data["names"].tolist(), sums=data["sums"], counts=data["counts"])
+
+def training_images(train_dir="train"):
+    # {"Abir": ["train/Abir/1.jpg", ...], ...}
+    students = {}
+    for name in sorted(os.listdir(train_dir)):
+        folder = os.path.join(train_dir, name)
+        if os.path.isdir(folder):
+            paths = [os.path.join(folder, f) for f in sorted(os.listdir(folder)) if f.lower().endswith(IMAGE_EXTENSIONS)]
+            if paths:
+                students[name] = paths
+    return students
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query the student embedding index.")
+    parser.add_argument("--index", default=INDEX_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Compute centroids for every train/<Name>/ folder")
+    build.add_argument("--train-dir", default="train")
+
+    enroll = sub.add_parser("enroll", help="Add or update one student from a few images")
+    enroll.add_argument("name")
+    enroll.add_argument("images", nargs="+")
+
+    remove = sub.add_parser("remove", help="Remove a student from the index")
+    remove.add_argument("name")
+
+    identify = sub.add_parser("identify", help="Identify the person in each image")
+    identify.add_argument("images", nargs="+")
+    identify.add_argument("--threshold", type=float, default=0.80, help="Minimum cosine similarity")
+    identify.add_argument("--ann", action="store_true", help="Use the approximate (faiss) index")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    index = EmbeddingIndex() if args.command == "build" else EmbeddingIndex.load(args.index)
+
+    if args.command == "remove":
+        if not index.remove(args.name):
+            raise SystemExit(f"Error: '{args.name}' is not in the index.")
+        index.save(args.index)
+        print(f"Removed {args.name}")
+        return
+
+    import Face_recognition_teachable as frt
+    extractor = build_feature_extractor(frt.load_classifier())
+
+    if args.command == "build":
+        for name, paths in training_images(args.train_dir).items():
+            index.enroll(name, extract_embeddings(extractor, load_image_batch(paths)))
+            print(f"{name}: {len(paths)} image(s)")
+        index.save(args.index)
+    elif args.command == "enroll":
+        index.enroll(args.name, extract_embeddings(extractor, load_image_batch(args.images)))
+        index.save(args.index)
+        print(f"Enrolled {args.name} ({index.counts[index.rows[args.name]]} image(s) total)")
+    elif args.command == "identify":
+        if args.ann:
+            index.build_ann()
+        student_database = frt.load_student_database()
+        embeddings = extract_embeddings(extractor, load_image_batch(args.images))
+        for path, (name, similarity) in zip(args.images, index.identify(embeddings, args.threshold)):
+            student_id = student_database.get(name, {}).get("id", "")
+            print(json.dumps({"path": path, "name": name, "id": student_id, "similarity": similarity}))
+
+if __name__ == "__main__":
+    main()
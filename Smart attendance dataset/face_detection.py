@@ -0,0 +1,126 @@
+import os
+import sys
+import json
+import argparse
+import numpy as np
+from preprocessing import BatchBuffer, preprocess_array
+
+# === Multi-face detection for group photos ===
+# Finds every face with OpenCV's bundled Haar cascade, crops each one (with a
+# little margin, like the Teachable Machine training shots), preprocesses the
+# crops exactly like file images and classifies them in a single batched
+# model.predict call.
+
+CASCADE_FILE = "haarcascade_frontalface_default.xml"
+
+class FaceDetector:
+    def __init__(self, scale_factor=1.1, min_neighbors=5, min_size=(40, 40), margin=0.25):
+        import cv2
+        path = os.path.join(cv2.data.haarcascades, CASCADE_FILE)
+        self.cascade = cv2.CascadeClassifier(path)
+        if self.cascade.empty():
+            raise FileNotFoundError(f"Error: '{path}' not found.")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+        self.margin = margin
+
+    def detect(self, rgb):
+        # Returns (x, y, w, h) boxes, widened by the margin and clipped to the image
+        import cv2
+        gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+        gray = cv2.equalizeHist(gray)
+        faces = self.cascade.detectMultiScale(
+            gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors, minSize=self.min_size
+        )
+        height, width = gray.shape
+        boxes = []
+        for x, y, w, h in faces:
+            pad_w, pad_h = int(w * self.margin), int(h * self.margin)
+            x0, y0 = max(0, x - pad_w), max(0, y - pad_h)
+            x1, y1 = min(width, x + w + pad_w), min(height, y + h + pad_h)
+            boxes.append((int(x0), int(y0), int(x1 - x0), int(y1 - y0)))
+        return boxes
+
+def crop_faces(rgb, boxes, out=None):
+    # Every crop goes through the shared preprocessing into one N x 224 x 224 x 3 batch
+    if out is None:
+        out = BatchBuffer(len(boxes)).data
+    for row, (x, y, w, h) in enumerate(boxes):
+        preprocess_array(rgb[y:y + h, x:x + w], out[row])
+    return out[:len(boxes)]
+
+def classify_faces(rgb, detector, predict_batch):
+    # Returns [(box, class_index, confidence), ...] for every detected face
+    boxes = detector.detect(rgb)
+    if not boxes:
+        return []
+    predictions = predict_batch(crop_faces(rgb, boxes))
+    results = []
+    for box, prediction in zip(boxes, predictions):
+        class_index = int(np.argmax(prediction))
+        results.append((box, class_index, float(prediction[class_index])))
+    return results
+
+def draw_faces(image, faces, labels):
+    # Draws boxes with their labels onto a PIL image (used for the UI preview)
+    from PIL import ImageDraw
+    draw = ImageDraw.Draw(image)
+    for (x, y, w, h), label in zip((face[0] for face in faces), labels):
+        draw.rectangle([x, y, x + w, y + h], outline="#4CAF50" if label != "Unknown" else "#f44336", width=3)
+        draw.text((x + 4, max(0, y - 14)), label, fill="#ffff00")
+    return image
+
+def load_rgb(image_path):
+    from PIL import Image
+    return np.asarray(Image.open(image_path).convert("RGB"))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Detect and classify every face in a classroom photo.")
+    parser.add_argument("images", nargs="+", help="Group photos to process")
+    parser.add_argument("--min-confidence", type=float, default=0.9750)
+    parser.add_argument("--status", default="Present", help="Status recorded for recognized faces")
+    parser.add_argument("--min-face", type=int, default=40, help="Smallest face size in pixels")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    import Face_recognition_teachable as frt
+    from datetime import datetime
+    from attendance_session import AttendanceSession
+    args = parse_args(argv)
+
+    model = frt.load_classifier()
+    class_names = frt.load_class_names()
+    student_database = frt.load_student_database()
+    detector = FaceDetector(min_size=(args.min_face, args.min_face))
+
+    # One attendance record (JSON line) per recognized face, each student at most once
+    session = AttendanceSession(student_database)
+    for image_path in args.images:
+        try:
+            rgb = load_rgb(image_path)
+        except Exception as e:
+            print(f"{image_path}\tError: {e}", file=sys.stderr)
+            continue
+        faces = classify_faces(rgb, detector, lambda batch: model.predict(batch, batch_size=len(batch), verbose=0))
+        recognized = 0
+        for box, class_index, confidence in faces:
+            result = frt.evaluate_top_class(class_index, confidence, class_names, student_database, args.min_confidence)
+            if result["name"] == "Unknown":
+                continue
+            record = {
+                "name": result["name"],
+                "id": result["id"],
+                "status": args.status,
+                "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "confidence": confidence,
+                "box": list(box),
+                "image": image_path
+            }
+            if session.mark(record):
+                recognized += 1
+                print(json.dumps(record))
+        print(f"{image_path}: {len(faces)} face(s) detected, {recognized} recognized", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import sys
+import json
+import argparse
+from datetime import datetime
+import numpy as np
+from face_detection import FaceDetector, crop_faces
+from live_recognition import parse_source
+
+# === Face tracking across frames ===
+# Faces are associated from frame to frame by box overlap (IoU), so each
+# person standing at the door becomes one track. model.predict only runs for
+# a new track, or for a track whose identity is still below min_confidence
+# (re-checked every few frames); confident tracks are never re-classified.
+# The predictions of a track are averaged over its lifetime and turned into a
+# single attendance decision when the track ends.
+
+def iou_matrix(boxes_a, boxes_b):
+    # (x, y, w, h) boxes -> len(a) x len(b) intersection-over-union
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    ax1, ay1 = a[:, 0] + a[:, 2], a[:, 1] + a[:, 3]
+    bx1, by1 = b[:, 0] + b[:, 2], b[:, 1] + b[:, 3]
+    w = np.clip(np.minimum(ax1[:, None], bx1) - np.maximum(a[:, None, 0], b[:, 0]), 0, None)
+    h = np.clip(np.minimum(ay1[:, None], by1) - np.maximum(a[:, None, 1], b[:, 1]), 0, None)
+    inter = w * h
+    union = (a[:, 2] * a[:, 3])[:, None] + b[:, 2] * b[:, 3] - inter
+    return inter / np.maximum(union, 1e-9)
+
+class Track:
+    def __init__(self, track_id, box, frame_index):
+        self.id = track_id
+        self.box = box
+        self.first_frame = frame_index
+        self.last_frame = frame_index
+        self.missed = 0
+        self.scores = None        # sum of the prediction vectors seen for this track
+        self.predictions = 0
+        self.last_predicted = None
+
+    def add_prediction(self, prediction, frame_index):
+        prediction = np.asarray(prediction, dtype=np.float32)
+        self.scores = prediction.copy() if self.scores is None else self.scores + prediction
+        self.predictions += 1
+        self.last_predicted = frame_index
+
+    def identity(self):
+        # (class_index, mean probability) over the track's lifetime
+        if self.scores is None:
+            return None, 0.0
+        mean = self.scores / self.predictions
+        class_index = int(np.argmax(mean))
+        return class_index, float(mean[class_index])
+
+class FaceTracker:
+    def __init__(self, iou_threshold=0.3, max_missed=10):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.tracks = []
+        self.next_id = 1
+
+    def update(self, boxes, frame_index):
+        # Returns (matched or new tracks for this frame, tracks that just ended)
+        current = []
+        unmatched_tracks = list(range(len(self.tracks)))
+        unmatched_boxes = list(range(len(boxes)))
+        if self.tracks and boxes:
+            overlaps = iou_matrix([track.box for track in self.tracks], boxes)
+            # Greedy: best overlapping pair first
+            for flat in np.argsort(overlaps, axis=None)[::-1]:
+                t, b = divmod(int(flat), len(boxes))
+                if overlaps[t, b] < self.iou_threshold:
+                    break
+                if t in unmatched_tracks and b in unmatched_boxes:
+                    track = self.tracks[t]
+                    track.box, track.last_frame, track.missed = boxes[b], frame_index, 0
+                    current.append(track)
+                    unmatched_tracks.remove(t)
+                    unmatched_boxes.remove(b)
+
+        ended = []
+        for t in unmatched_tracks:
+            track = self.tracks[t]
+            track.missed += 1
+            if track.missed > self.max_missed:
+                ended.append(track)
+        for b in unmatched_boxes:
+            track = Track(self.next_id, boxes[b], frame_index)
+            self.next_id += 1
+            self.tracks.append(track)
+            current.append(track)
+        self.tracks = [track for track in self.tracks if track not in ended]
+        return current, ended
+
+    def flush(self):
+        # Ends every remaining track (end of video / capture stopped)
+        ended, self.tracks = self.tracks, []
+        return ended
+
+class TrackedRecognizer:
+    def __init__(self, detector, predict_batch, min_confidence=0.975, retry_every=3, iou_threshold=0.3,
+                 max_missed=10):
+        self.detector = detector
+        self.predict_batch = predict_batch
+        self.min_confidence = min_confidence
+        self.retry_every = max(1, retry_every)
+        self.tracker = FaceTracker(iou_threshold, max_missed)
+        self.frames = 0
+        self.faces = 0
+        self.predictions = 0
+        self.predict_calls = 0
+
+    def needs_prediction(self, track, frame_index):
+        if track.predictions == 0:
+            return True
+        _, confidence = track.identity()
+        return confidence < self.min_confidence and frame_index - track.last_predicted >= self.retry_every
+
+    def process(self, rgb, frame_index):
+        # Returns the tracks that ended on this frame (ready for a decision)
+        boxes = self.detector.detect(rgb)
+        self.frames += 1
+        self.faces += len(boxes)
+        current, ended = self.tracker.update(boxes, frame_index)
+        pending = [track for track in current if self.needs_prediction(track, frame_index)]
+        if pending:
+            predictions = self.predict_batch(crop_faces(rgb, [track.box for track in pending]))
+            self.predict_calls += 1
+            self.predictions += len(pending)
+            for track, prediction in zip(pending, predictions):
+                track.add_prediction(prediction, frame_index)
+        return ended
+
+    def finish(self):
+        return self.tracker.flush()
+
+    def summary(self):
+        return {
+            "frames": self.frames,
+            "faces_detected": self.faces,
+            "tracks": self.tracker.next_id - 1,
+            "faces_classified": self.predictions,
+            "predict_calls": self.predict_calls,
+            "classified_fraction": self.predictions / self.faces if self.faces else 0.0
+        }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Track faces in a camera/video feed and mark each person once.")
+    parser.add_argument("--source", type=parse_source, default=0, help="Camera index or video file path")
+    parser.add_argument("--min-confidence", type=float, default=0.9750)
+    parser.add_argument("--status", default="Present", help="Status recorded for recognized tracks")
+    parser.add_argument("--retry-every", type=int, default=3,
+                        help="Frames between re-classifications of a track that is still uncertain")
+    parser.add_argument("--iou", type=float, default=0.3, help="Minimum box overlap to continue a track")
+    parser.add_argument("--max-missed", type=int, default=10, help="Frames a face may vanish before its track ends")
+    parser.add_argument("--min-face", type=int, default=40, help="Smallest face size in pixels")
+    parser.add_argument("--min-track-frames", type=int, default=3, help="Ignore tracks seen for fewer frames")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    import cv2
+    import Face_recognition_teachable as frt
+    from attendance_session import AttendanceSession
+    args = parse_args(argv)
+
+    model = frt.load_classifier()
+    class_names = frt.load_class_names()
+    student_database = frt.load_student_database()
+    recognizer = TrackedRecognizer(
+        FaceDetector(min_size=(args.min_face, args.min_face)),
+        lambda batch: model.predict(batch, batch_size=len(batch), verbose=0),
+        min_confidence=args.min_confidence,
+        retry_every=args.retry_every,
+        iou_threshold=args.iou,
+        max_missed=args.max_missed
+    )
+    session = AttendanceSession(student_database)
+
+    def decide(tracks):
+        # One attendance decision per track, each student at most once per session
+        for track in tracks:
+            if track.last_frame - track.first_frame + 1 < args.min_track_frames:
+                continue
+            class_index, confidence = track.identity()
+            if class_index is None:
+                continue
+            result = frt.evaluate_top_class(class_index, confidence, class_names, student_database, args.min_confidence)
+            if result["name"] == "Unknown":
+                print(f"track {track.id}: Unknown Person ({confidence:.2%})", file=sys.stderr)
+                continue
+            record = {
+                "name": result["name"],
+                "id": result["id"],
+                "status": args.status,
+                "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "confidence": confidence,
+                "track": track.id,
+                "frames": [track.first_frame, track.last_frame],
+                "predictions": track.predictions
+            }
+            if session.mark(record):
+                print(json.dumps(record))
+
+    cap = cv2.VideoCapture(args.source)
+    if not cap.isOpened():
+        raise SystemExit("Error: Could not open camera.")
+    frame_index = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_index += 1
+            decide(recognizer.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), frame_index))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+    decide(recognizer.finish())
+    summary = recognizer.summary()
+    print(f"{summary['frames']} frame(s), {summary['faces_detected']} face detection(s) in {summary['tracks']} track(s); "
+          f"classified {summary['faces_classified']} ({summary['classified_fraction']:.1%}) "
+          f"in {summary['predict_calls']} predict call(s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import numpy as np
+from preprocessing import BatchBuffer, collect_image_paths, preprocess_path
+
+# === Inference backends ===
+# keras.Model.predict builds a tf.data pipeline and callbacks on every call,
+# which dominates the latency of a single 224x224 image. Besides the default
+# "keras" backend this module offers:
+#   direct  - calls the Keras model as a function (model(x, training=False))
+#   tflite  - runs an exported keras_model.tflite in the TFLite interpreter
+#             (optionally float16 or int8 post-training quantized)
+#   cascade - a cheap first stage with the full model for uncertain images
+#             (see cascade.py)
+# Every backend exposes predict(batch, batch_size=None, verbose=0), so it is a
+# drop-in replacement for the Keras model in the CLI, the UI and the tools.
+# `python inference_backend.py export` writes the .tflite file and
+# `python inference_backend.py compare test/` prints accuracy vs latency.
+
+MODEL_PATH = "keras_model.h5"
+LABELS_PATH = "labels.txt"
+TFLITE_PATH = "keras_model.tflite"
+BACKENDS = ("keras", "direct", "tflite", "cascade")
+
+def _hash_files(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def model_fingerprint(model_path=MODEL_PATH, labels_path=LABELS_PATH):
+    # Identifies the exact model + label set, so results from different models are never mixed
+    return _hash_files((model_path, labels_path))
+
+def backend_fingerprint(backend="keras", model_path=MODEL_PATH, min_confidence=None, margin=None):
+    # model_fingerprint plus whatever else changes the backend's output: the .tflite
+    # file for "tflite[:path]", and the first stage and gate for "cascade[:backend]"
+    name, _, argument = backend.partition(":")
+    parts = [model_fingerprint(model_path), name]
+    if name == "tflite":
+        parts.append(_hash_files((argument or TFLITE_PATH,)))
+    elif name == "cascade":
+        from cascade import DEFAULT_FAST_BACKEND, DEFAULT_MARGIN, DEFAULT_MIN_CONFIDENCE
+        parts.append(backend_fingerprint(argument or DEFAULT_FAST_BACKEND, model_path))
+        parts.append(str(DEFAULT_MIN_CONFIDENCE if min_confidence is None else min_confidence))
+        parts.append(str(DEFAULT_MARGIN if margin is None else margin))
+    return hashlib.sha256(":".join(parts).encode("utf-8")).hexdigest()[:16]
+
+def load_keras_model(model_path=MODEL_PATH):
+    from keras.models import load_model
+    return load_model(model_path, compile=False)
+
+class DirectModel:
+    # Calls the Keras model directly; skips predict()'s per-call pipeline setup
+    def __init__(self, keras_model):
+        self.keras_model = keras_model
+
+    def predict(self, batch, batch_size=None, verbose=0):
+        return np.asarray(self.keras_model(batch, training=False))
+
+class TFLiteModel:
+    def __init__(self, tflite_path=TFLITE_PATH, model_path=MODEL_PATH, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.interpreter = Interpreter(model_path=tflite_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = int(self.input["shape"][0])
+        self.model_path = model_path
+        self._keras_model = None
+
+    @property
+    def keras_model(self):
+        # Only the embedding fallback needs the Keras layers; load them on first use
+        if self._keras_model is None:
+            self._keras_model = load_keras_model(self.model_path)
+        return self._keras_model
+
+    def _resize(self, batch_size):
+        if batch_size != self.batch_size:
+            shape = [batch_size] + list(self.input["shape"][1:])
+            self.interpreter.resize_tensor_input(self.input["index"], shape)
+            self.interpreter.allocate_tensors()
+            self.input = self.interpreter.get_input_details()[0]
+            self.output = self.interpreter.get_output_details()[0]
+            self.batch_size = batch_size
+
+    def predict(self, batch, batch_size=None, verbose=0):
+        self._resize(len(batch))
+        scale, zero_point = self.input["quantization"]
+        if scale:
+            # Full-integer model: quantize the [-1, 1] input
+            batch = np.clip(np.round(batch / scale + zero_point), *self._limits(self.input["dtype"]))
+        self.interpreter.set_tensor(self.input["index"], np.asarray(batch, dtype=self.input["dtype"]))
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self.output["index"])
+        scale, zero_point = self.output["quantization"]
+        if scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+    @staticmethod
+    def _limits(dtype):
+        info = np.iinfo(dtype)
+        return info.min, info.max
+
+def load_backend(backend="keras", model_path=MODEL_PATH, num_threads=None, min_confidence=None, margin=None):
+    # backend: "keras", "direct", "tflite[:<path to .tflite>]" or "cascade[:<first stage backend>]".
+    # min_confidence / margin set the cascade's escalation gate (pass the caller's decision
+    # threshold, so the first stage only answers what would be accepted); other backends ignore them.
+    name, _, tflite_path = backend.partition(":")
+    if name == "cascade":
+        from cascade import DEFAULT_FAST_BACKEND, DEFAULT_MARGIN, DEFAULT_MIN_CONFIDENCE, Cascade
+        fast = load_backend(tflite_path or DEFAULT_FAST_BACKEND, model_path, num_threads)
+        return Cascade(fast, load_backend("direct", model_path, num_threads),
+                       DEFAULT_MIN_CONFIDENCE if min_confidence is None else min_confidence,
+                       DEFAULT_MARGIN if margin is None else margin)
+    if name == "tflite":
+        tflite_path = tflite_path or TFLITE_PATH
+        if not os.path.exists(tflite_path):
+            raise FileNotFoundError(f"Error: '{tflite_path}' not found. Run 'python inference_backend.py export' first.")
+        return TFLiteModel(tflite_path, model_path, num_threads)
+    if name not in BACKENDS:
+        raise ValueError(f"Error: unknown backend '{backend}' (choose from {', '.join(BACKENDS)}).")
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Error: '{model_path}' not found.")
+    model = load_keras_model(model_path)
+    return DirectModel(model) if name == "direct" else model
+
+# === Export ===
+def calibration_images(train_dir="train", samples=100):
+    # Spread the calibration set evenly over every student folder
+    per_student = []
+    for name in sorted(os.listdir(train_dir)):
+        folder = os.path.join(train_dir, name)
+        if os.path.isdir(folder):
+            per_student.append(collect_image_paths([folder]))
+    paths = []
+    while len(paths) < samples and any(per_student):
+        for images in per_student:
+            if images and len(paths) < samples:
+                paths.append(images.pop(0))
+    return paths
+
+def export_tflite(model_path=MODEL_PATH, output_path=TFLITE_PATH, quantize="none", train_dir="train", samples=100):
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(load_keras_model(model_path))
+    if quantize == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == "int8":
+        paths = calibration_images(train_dir, samples)
+        if not paths:
+            raise FileNotFoundError(f"Error: no calibration images found in {train_dir}.")
+
+        def representative_dataset():
+            for path in paths:
+                yield [preprocess_path(path, cache=None)[np.newaxis]]
+
+        # Weights and activations in int8; the model keeps float32 input/output so
+        # callers pass the same [-1, 1] tensors as for Keras
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+    tflite_model = converter.convert()
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(tflite_model)
+    os.replace(tmp_path, output_path)
+    return len(tflite_model)
+
+# === Accuracy vs latency ===
+def expected_label(path, class_names):
+    # test/Abir31.jpg -> "Abir"; people outside the model (iryn.jpg, Chanman.jpg) -> "Unknown"
+    stem = re.sub(r"\d+$", "", os.path.splitext(os.path.basename(path))[0])
+    return stem if stem in class_names else "Unknown"
+
+def compare_backend(model, image_paths, class_names, min_confidence, repeats=3):
+    # Batch size 1 - the latency a door capture sees
+    buffer = BatchBuffer(1)
+    model.predict(np.zeros(buffer.data.shape, dtype=np.float32), verbose=0)  # warm-up
+    latencies = []
+    correct = 0
+    for path in image_paths:
+        preprocess_path(path, buffer.data[0])
+        for _ in range(repeats):
+            started = time.perf_counter()
+            prediction = model.predict(buffer.data, batch_size=1, verbose=0)[0]
+            latencies.append(time.perf_counter() - started)
+        top_index = int(np.argmax(prediction))
+        predicted = class_names[top_index] if prediction[top_index] >= min_confidence else "Unknown"
+        correct += predicted == expected_label(path, class_names)
+    latencies = np.array(latencies) * 1000
+    return {
+        "images": len(image_paths),
+        "accuracy": correct / len(image_paths),
+        "mean_ms": float(latencies.mean()),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95))
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export and compare inference backends for keras_model.h5.")
+    parser.add_argument("--model", default=MODEL_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = sub.add_parser("export", help="Convert the Keras model to TensorFlow Lite")
+    export_cmd.add_argument("--output", default=None, help="Default: keras_model.tflite, keras_model_<quantize>.tflite")
+    export_cmd.add_argument("--quantize", choices=("none", "float16", "int8"), default="none")
+    export_cmd.add_argument("--train-dir", default="train", help="Calibration images for int8")
+    export_cmd.add_argument("--samples", type=int, default=100, help="Number of calibration images")
+
+    compare_cmd = sub.add_parser("compare", help="Accuracy vs latency of several backends")
+    compare_cmd.add_argument("inputs", nargs="*", default=["test"])
+    compare_cmd.add_argument("--backends", nargs="+", default=["keras", "direct", "tflite"],
+                             help="keras, direct, tflite or tflite:<path>")
+    compare_cmd.add_argument("--repeats", type=int, default=3, help="Timed predictions per image")
+    compare_cmd.add_argument("--threads", type=int, default=None, help="TFLite interpreter threads")
+    compare_cmd.add_argument("--min-confidence", type=float, default=0.9750)
+    compare_cmd.add_argument("--json", action="store_true")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "export":
+        output = args.output or (TFLITE_PATH if args.quantize == "none" else f"keras_model_{args.quantize}.tflite")
+        size = export_tflite(args.model, output, args.quantize, args.train_dir, args.samples)
+        print(f"Wrote {output} ({size / 1e6:.1f} MB, quantize={args.quantize})")
+        return
+
+    with open("labels.txt", "r") as f:
+        class_names = [line.strip().split(" ", 1)[-1].strip() for line in f]
+    image_paths = collect_image_paths(args.inputs)
+    if not image_paths:
+        raise FileNotFoundError(f"Error: no images found in {', '.join(args.inputs)}.")
+
+    for backend in args.backends:
+        try:
+            model = load_backend(backend, args.model, args.threads)
+        except (FileNotFoundError, ValueError, ImportError) as e:
+            print(f"{backend}: skipped ({e})", file=sys.stderr)
+            continue
+        result = compare_backend(model, image_paths, class_names, args.min_confidence, args.repeats)
+        if args.json:
+            print(json.dumps({"backend": backend, **result}))
+        else:
+            print(f"{backend:<28} accuracy {result['accuracy']:.2%}  mean {result['mean_ms']:.2f} ms  "
+                  f"p50 {result['p50_ms']:.2f} ms  p95 {result['p95_ms']:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+
+# === Background inference worker ===
+# Runs model jobs on a dedicated thread so the Tk event loop never blocks on
+# decode/resize/predict. Jobs are queued; results are handed back on the Tk
+# thread through an after() polling loop.
+class InferenceWorker(threading.Thread):
+    def __init__(self, model_loader, input_shape=(1, 224, 224, 3)):
+        super().__init__(daemon=True)
+        # model_loader() does the heavy imports and deserialization on the worker thread;
+        # it returns None when no model is available
+        self.model_loader = model_loader
+        self.input_shape = input_shape
+        self.model = None
+        self.load_error = None
+        self.load_seconds = None
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.ready = threading.Event()
+        self._start_lock = threading.Lock()
+        self._launched = False
+
+    def ensure_started(self):
+        # Safe to call from every entry point; only the first call starts the thread
+        with self._start_lock:
+            if not self._launched:
+                self._launched = True
+                self.start()
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            self.model = self.model_loader()
+            if self.model is not None:
+                # Warm up once so the first real request doesn't pay for graph tracing
+                self.model.predict(np.zeros(self.input_shape, dtype=np.float32), verbose=0)
+        except Exception as e:
+            self.model, self.load_error = None, e
+        self.load_seconds = time.perf_counter() - started
+        self.ready.set()
+
+        while True:
+            item = self.requests.get()
+            if item is None:
+                break
+            job, callback = item
+            if self.model is None:
+                result, error = None, RuntimeError(self.unavailable_reason())
+            else:
+                try:
+                    result, error = job(self.model), None
+                except Exception as e:
+                    result, error = None, e
+            if isinstance(callback, Future):
+                # Synchronous callers (run_sync) are resolved directly, not via the Tk thread
+                if error is None:
+                    callback.set_result(result)
+                else:
+                    callback.set_exception(error)
+            else:
+                self.results.put((callback, result, error))
+
+    def available(self):
+        # False only once loading has finished without a model
+        return not self.ready.is_set() or self.model is not None
+
+    def unavailable_reason(self):
+        if self.load_error is not None:
+            return f"Model could not be loaded: {self.load_error}"
+        return "Model not found. Face recognition disabled."
+
+    def submit(self, job, callback):
+        # job(model) runs on the worker thread; callback(result, error) runs on the Tk thread
+        self.ensure_started()
+        self.requests.put((job, callback))
+
+    def run_sync(self, job):
+        # Blocks the calling (non-Tk) thread until job(model) has run on the worker
+        future = Future()
+        self.submit(job, future)
+        return future.result()
+
+    def pending(self):
+        return self.requests.qsize()
+
+    def poll(self, widget, interval_ms=50):
+        while True:
+            try:
+                callback, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            callback(result, error)
+        widget.after(interval_ms, self.poll, widget, interval_ms)
+
+    def stop(self):
+        self.requests.put(None)
@@ -0,0 +1,282 @@
+import sys
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+import numpy as np
+from preprocessing import preprocess_bgr
+
+# === Live webcam recognition ===
+# A reader thread keeps pulling frames from cv2.VideoCapture into a small
+# bounded queue (oldest frame dropped when full), so capture never waits on
+# model.predict. The recognition thread drains that queue, keeps only the
+# frames chosen by the sampler (every Nth frame, or frames that changed) and
+# classifies them straight from memory in one batched predict call.
+
+def put_drop_oldest(q, item):
+    # Returns True when an older item had to be discarded to make room
+    dropped = False
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                q.get_nowait()
+                dropped = True
+            except queue.Empty:
+                pass
+
+def parse_source(value):
+    # "0" -> camera index 0, anything else is a video file or stream URL
+    return int(value) if value.isdigit() else value
+
+class FrameGrabber(threading.Thread):
+    # Cameras deliver frames in real time and the oldest queued frame is dropped
+    # when recognition falls behind. A video file would otherwise be decoded as
+    # fast as the CPU allows, so by default it is paced to its CAP_PROP_FPS;
+    # with realtime=False (or no usable FPS) every file frame is queued with a
+    # blocking put instead, so none are dropped.
+    def __init__(self, source=0, max_queue=4, realtime=True):
+        super().__init__(daemon=True)
+        self.source = source
+        self.is_file = not isinstance(source, int)
+        self.realtime = realtime
+        self.frames = queue.Queue(maxsize=max_queue)
+        self.running = threading.Event()
+        self.opened = threading.Event()
+        self.error = None
+        self.latest = None
+        self.captured = 0
+        self.dropped = 0
+
+    def run(self):
+        import cv2
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            self.error = "Could not open camera."
+            self.opened.set()
+            self.frames.put(None)
+            return
+        self.running.set()
+        self.opened.set()
+
+        fps = cap.get(cv2.CAP_PROP_FPS) if self.is_file and self.realtime else 0
+        interval = 1.0 / fps if fps and 0 < fps < 1000 else None
+        blocking = self.is_file and interval is None
+        next_frame = time.perf_counter()
+        while self.running.is_set():
+            if interval is not None:
+                delay = next_frame - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_frame += interval
+            ret, frame = cap.read()
+            if not ret:
+                break
+            self.captured += 1
+            item = (self.captured, time.perf_counter(), frame)
+            self.latest = item
+            if blocking:
+                self._put_blocking(item)
+            elif put_drop_oldest(self.frames, item):
+                self.dropped += 1
+
+        cap.release()
+        self.running.clear()
+        put_drop_oldest(self.frames, None)
+
+    def _put_blocking(self, item):
+        while self.running.is_set():
+            try:
+                self.frames.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def stop(self):
+        self.running.clear()
+
+class FrameSampler:
+    # Picks which frames are worth classifying: every Nth frame, or - when a
+    # change threshold is set - only frames whose thumbnail differs enough
+    # from the last classified one.
+    def __init__(self, every_n=5, change_threshold=None):
+        self.every_n = max(1, every_n)
+        self.change_threshold = change_threshold
+        self.previous = None
+
+    def should_classify(self, index, frame):
+        if self.change_threshold is None:
+            return (index - 1) % self.every_n == 0
+        thumbnail = frame[::16, ::16].mean(axis=2, dtype=np.float32)
+        if self.previous is not None and thumbnail.shape == self.previous.shape:
+            if np.abs(thumbnail - self.previous).mean() < self.change_threshold:
+                return False
+        self.previous = thumbnail
+        return True
+
+def preprocess_frame(frame, out=None):
+    # BGR capture buffer -> normalized 224x224x3 float32 via the shared preprocessing pipeline
+    return preprocess_bgr(frame, out)
+
+class LiveStats:
+    def __init__(self, window=120):
+        self.latencies = deque(maxlen=window)
+        self.classified = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+
+    def record(self, latency):
+        self.latencies.append(latency)
+        self.classified += 1
+
+    def summary(self, grabber):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        latencies = sorted(self.latencies)
+        return {
+            "capture_fps": grabber.captured / elapsed,
+            "classified_fps": self.classified / elapsed,
+            "frames_captured": grabber.captured,
+            "frames_classified": self.classified,
+            "frames_dropped": grabber.dropped,
+            "batches": self.batches,
+            "latency_ms_p50": latencies[len(latencies) // 2] * 1000 if latencies else None,
+            "latency_ms_last": self.latencies[-1] * 1000 if latencies else None,
+        }
+
+    def format(self, grabber):
+        s = self.summary(grabber)
+        latency = "n/a" if s["latency_ms_p50"] is None else f"{s['latency_ms_p50']:.0f} ms"
+        return (f"Capture {s['capture_fps']:.1f} FPS | Classified {s['classified_fps']:.1f} FPS | "
+                f"Latency p50 {latency} | Dropped {s['frames_dropped']}")
+
+class LiveRecognizer:
+    def __init__(self, predict_batch, on_result, source=0, every_n=5, change_threshold=None, batch_size=4):
+        # predict_batch(N x 224 x 224 x 3 array) -> N predictions
+        # on_result(frame_index, frame, prediction, latency_seconds) is called on the recognition thread
+        self.predict_batch = predict_batch
+        self.on_result = on_result
+        self.batch_size = max(1, batch_size)
+        self.grabber = FrameGrabber(source, max_queue=self.batch_size * 2)
+        self.sampler = FrameSampler(every_n, change_threshold)
+        self.stats = LiveStats()
+        self.buffer = np.empty((self.batch_size, 224, 224, 3), dtype=np.float32)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.error = None
+
+    def start(self):
+        self.grabber.start()
+        self.thread.start()
+
+    def stop(self):
+        self.grabber.stop()
+
+    def is_running(self):
+        return self.thread.is_alive()
+
+    def _next_batch(self):
+        batch = []
+        item = self.grabber.frames.get()
+        while item is not None:
+            index, _, frame = item
+            if self.sampler.should_classify(index, frame):
+                batch.append(item)
+                if len(batch) == self.batch_size:
+                    break
+            try:
+                item = self.grabber.frames.get_nowait()
+            except queue.Empty:
+                if batch:
+                    break
+                item = self.grabber.frames.get()
+        return batch, item is None
+
+    def _run(self):
+        while True:
+            batch, finished = self._next_batch()
+            if batch:
+                for row, (_, _, frame) in enumerate(batch):
+                    preprocess_frame(frame, self.buffer[row])
+                try:
+                    predictions = self.predict_batch(self.buffer[:len(batch)])
+                except Exception as e:
+                    self.error = e
+                    self.grabber.stop()
+                    return
+                self.stats.batches += 1
+                done = time.perf_counter()
+                for (index, captured_at, frame), prediction in zip(batch, predictions):
+                    latency = done - captured_at
+                    self.stats.record(latency)
+                    self.on_result(index, frame, prediction, latency)
+            if finished:
+                self.error = self.error or self.grabber.error
+                return
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Continuous face recognition from a camera or video file.")
+    parser.add_argument("--source", type=parse_source, default=0, help="Camera index or video file path")
+    parser.add_argument("--every", type=int, default=5, help="Classify every Nth frame")
+    parser.add_argument("--change-threshold", type=float, default=None,
+                        help="Only classify frames whose mean pixel change exceeds this value (0-255)")
+    parser.add_argument("--batch-size", type=int, default=4, help="Maximum frames per model.predict call")
+    parser.add_argument("--min-confidence", type=float, default=0.9750)
+    parser.add_argument("--show", action="store_true", help="Show the camera feed; press 'q' to stop")
+    parser.add_argument("--stats-every", type=float, default=5.0, help="Seconds between FPS/latency lines")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    import Face_recognition_teachable as frt
+    args = parse_args(argv)
+
+    model = frt.load_classifier()
+    class_names = frt.load_class_names()
+    student_database = frt.load_student_database()
+
+    def on_result(index, frame, prediction, latency):
+        result = frt.evaluate_prediction(prediction, class_names, student_database, args.min_confidence)
+        name = result["name"] if result["name"] != "Unknown" else "Unknown Person"
+        print(f"frame {index}\t{name}\tConfidence: {result['confidence']:.2%}\tLatency: {latency * 1000:.0f} ms")
+
+    recognizer = LiveRecognizer(
+        lambda batch: model.predict(batch, batch_size=len(batch), verbose=0),
+        on_result,
+        source=args.source,
+        every_n=args.every,
+        change_threshold=args.change_threshold,
+        batch_size=args.batch_size
+    )
+    recognizer.start()
+
+    last_stats = time.perf_counter()
+    try:
+        while recognizer.is_running():
+            if args.show:
+                import cv2
+                latest = recognizer.grabber.latest
+                if latest is not None:
+                    cv2.imshow("Live Recognition - Press 'q' to Stop", latest[2])
+                if cv2.waitKey(15) & 0xFF == ord('q'):
+                    break
+            else:
+                recognizer.thread.join(0.1)
+            if time.perf_counter() - last_stats >= args.stats_every:
+                print(recognizer.stats.format(recognizer.grabber), file=sys.stderr)
+                last_stats = time.perf_counter()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recognizer.stop()
+        recognizer.thread.join(5)
+        if args.show:
+            import cv2
+            cv2.destroyAllWindows()
+
+    if recognizer.error:
+        print(f"Error: {recognizer.error}", file=sys.stderr)
+    print(recognizer.stats.format(recognizer.grabber), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import time
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# === Hot-path instrumentation ===
+# Stage timers and counters for the capture -> classify -> mark pipeline.
+# Every stage keeps a cumulative histogram (Prometheus buckets, for scraping)
+# and a window of the most recent samples (for p50/p95 in the log line).
+# Disabled by default: timer() then hands back one shared no-op context and
+# inc() returns immediately, so instrumented code pays a single attribute check.
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_DISABLED = nullcontext()
+
+class Histogram:
+    def __init__(self, window=1024):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+    def quantile(self, q):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class _StageTimer:
+    __slots__ = ("metrics", "stage", "started")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.started)
+        return False
+
+class Metrics:
+    def __init__(self, enabled=False, window=1024):
+        self.enabled = enabled
+        self.window = window
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def timer(self, stage):
+        # with metrics.timer("predict"): ...
+        if not self.enabled:
+            return _DISABLED
+        return _StageTimer(self, stage)
+
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram(self.window)
+            histogram.observe(seconds)
+
+    def inc(self, counter, amount=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "stages": {
+                    stage: {"count": h.count, "sum": h.sum, "p50": h.quantile(0.50), "p95": h.quantile(0.95)}
+                    for stage, h in self.histograms.items()
+                },
+                "counters": dict(self.counters)
+            }
+
+    def log_line(self):
+        snapshot = self.snapshot()
+        stages = " ".join(
+            f"{stage}[n={s['count']} p50={s['p50'] * 1000:.1f}ms p95={s['p95'] * 1000:.1f}ms]"
+            for stage, s in sorted(snapshot["stages"].items())
+        )
+        counters = " ".join(f"{name}={value}" for name, value in sorted(snapshot["counters"].items()))
+        return f"metrics {stages} {counters}".rstrip()
+
+    def prometheus_text(self, prefix="iaes"):
+        lines = [f"# TYPE {prefix}_stage_seconds histogram"]
+        with self.lock:
+            for stage, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ("+Inf",), h.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {h.sum}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {h.count}')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def start_reporter(self, interval, log=print):
+        # Periodic log line on a daemon thread
+        self.enabled = True
+
+        def report():
+            while True:
+                time.sleep(interval)
+                log(self.log_line())
+
+        thread = threading.Thread(target=report, daemon=True)
+        thread.start()
+        return thread
+
+    def serve(self, port, host="127.0.0.1"):
+        # Prometheus scrape endpoint at http://host:port/metrics on a daemon thread
+        self.enabled = True
+        server = ThreadingHTTPServer((host, port), make_metrics_handler(self))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+def make_metrics_handler(metrics):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+metrics = Metrics()  # shared registry; enabled by --metrics-interval / --metrics-port
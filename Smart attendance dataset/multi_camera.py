@@ -0,0 +1,222 @@
+import sys
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+from live_recognition import FrameGrabber, FrameSampler, parse_source, preprocess_frame
+from recognition_server import MicroBatcher
+
+# === Multi-camera capture ===
+# One FrameGrabber thread per camera/video file, each with its own small
+# drop-oldest queue, so a slow or stalled entrance never holds up the others.
+# A scheduler thread visits the sources round-robin and takes at most one
+# sampled frame per source per round (fair share), skipping a source while it
+# already has --max-inflight frames waiting on the model (backpressure; its
+# grabber keeps only the newest frames meanwhile). All sources feed one shared
+# MicroBatcher, so frames from different entrances share predict calls.
+# Video files are replayed at their recorded FPS, like a camera, unless
+# --no-realtime asks for every frame as fast as possible.
+
+class SourceStats:
+    def __init__(self, window=240):
+        self.sampled = 0
+        self.classified = 0
+        self.skipped_busy = 0
+        self.errors = 0
+        self.queue_delays = deque(maxlen=window)  # capture -> handed to the model
+        self.latencies = deque(maxlen=window)     # capture -> prediction
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def record_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def record(self, queue_delay, latency):
+        with self.lock:
+            self.classified += 1
+            self.queue_delays.append(queue_delay)
+            self.latencies.append(latency)
+
+    def summary(self, grabber):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        with self.lock:
+            queue_delays = sorted(self.queue_delays)
+            latencies = sorted(self.latencies)
+        return {
+            "capture_fps": grabber.captured / elapsed,
+            "classified_fps": self.classified / elapsed,
+            "frames_captured": grabber.captured,
+            "frames_dropped": grabber.dropped,
+            "frames_sampled": self.sampled,
+            "frames_classified": self.classified,
+            "rounds_skipped_busy": self.skipped_busy,
+            "prediction_errors": self.errors,
+            "queue_delay_ms_p50": queue_delays[len(queue_delays) // 2] * 1000 if queue_delays else None,
+            "latency_ms_p50": latencies[len(latencies) // 2] * 1000 if latencies else None,
+        }
+
+class CameraSource:
+    def __init__(self, source, every_n=5, change_threshold=None, max_queue=4, realtime=True):
+        self.source = source
+        self.grabber = FrameGrabber(source, max_queue=max_queue, realtime=realtime)
+        self.sampler = FrameSampler(every_n, change_threshold)
+        self.stats = SourceStats()
+        self.inflight = 0
+        self.finished = False
+
+class MultiCameraRecognizer:
+    def __init__(self, batcher, on_result, sources, every_n=5, change_threshold=None, max_inflight=2,
+                 realtime=True):
+        # on_result(source, frame_index, frame, prediction, latency_seconds) runs on the batcher thread
+        self.batcher = batcher
+        self.on_result = on_result
+        self.max_inflight = max(1, max_inflight)
+        self.sources = [CameraSource(source, every_n, change_threshold, realtime=realtime) for source in sources]
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        for camera in self.sources:
+            camera.grabber.start()
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        for camera in self.sources:
+            camera.grabber.stop()
+
+    def is_running(self):
+        return self.thread.is_alive()
+
+    def _submit(self, camera, index, captured_at, frame):
+        tensor = preprocess_frame(frame)
+        submitted = time.perf_counter()
+        with self.lock:
+            camera.inflight += 1
+        future = self.batcher.submit(tensor)
+
+        def done(future):
+            finished = time.perf_counter()
+            with self.lock:
+                camera.inflight -= 1
+            error = future.exception()
+            if error is not None:
+                camera.stats.record_error()
+                print(f"[{camera.source}] frame {index}: prediction failed: {error}", file=sys.stderr)
+                return
+            camera.stats.record(submitted - captured_at, finished - captured_at)
+            self.on_result(camera.source, index, frame, future.result(), finished - captured_at)
+
+        future.add_done_callback(done)
+
+    def _run(self):
+        while not self.stopping.is_set():
+            active = [camera for camera in self.sources if not camera.finished]
+            if not active:
+                break
+            submitted = 0
+            for camera in active:
+                with self.lock:
+                    busy = camera.inflight >= self.max_inflight
+                if busy:
+                    camera.stats.skipped_busy += 1
+                    continue
+                # One sampled frame per source per round
+                while True:
+                    try:
+                        item = camera.grabber.frames.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        camera.finished = True
+                        break
+                    index, captured_at, frame = item
+                    if camera.sampler.should_classify(index, frame):
+                        camera.stats.sampled += 1
+                        self._submit(camera, index, captured_at, frame)
+                        submitted += 1
+                        break
+            if not submitted:
+                time.sleep(0.002)
+        # Let frames already handed to the model finish
+        deadline = time.perf_counter() + 5
+        while any(camera.inflight for camera in self.sources) and time.perf_counter() < deadline:
+            time.sleep(0.01)
+
+    def format_stats(self):
+        lines = []
+        for camera in self.sources:
+            s = camera.stats.summary(camera.grabber)
+            queue_delay = "n/a" if s["queue_delay_ms_p50"] is None else f"{s['queue_delay_ms_p50']:.0f} ms"
+            latency = "n/a" if s["latency_ms_p50"] is None else f"{s['latency_ms_p50']:.0f} ms"
+            lines.append(f"[{camera.source}] Capture {s['capture_fps']:.1f} FPS | Classified {s['classified_fps']:.1f} FPS | "
+                         f"Queue delay p50 {queue_delay} | Latency p50 {latency} | Dropped {s['frames_dropped']} | "
+                         f"Errors {s['prediction_errors']}")
+        batch = self.batcher.stats()
+        lines.append(f"Shared engine: {batch['batches']} batch(es), mean batch size {batch['mean_batch_size']:.1f}")
+        return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Recognize faces from several cameras or video files at once.")
+    parser.add_argument("--source", dest="sources", type=parse_source, action="append", required=True,
+                        help="Camera index or video file; repeat for each entrance")
+    parser.add_argument("--every", type=int, default=5, help="Classify every Nth frame of each source")
+    parser.add_argument("--change-threshold", type=float, default=None,
+                        help="Only classify frames whose mean pixel change exceeds this value (0-255)")
+    parser.add_argument("--no-realtime", dest="realtime", action="store_false",
+                        help="Read video files as fast as possible (no frames dropped) instead of at their FPS")
+    parser.add_argument("--max-inflight", type=int, default=2, help="Frames per source waiting on the model")
+    parser.add_argument("--max-batch", type=int, default=8, help="Most frames per model.predict call")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="Longest wait for a batch to fill")
+    parser.add_argument("--backend", default="keras", help="keras, direct, tflite[:path] or cascade[:first stage]")
+    parser.add_argument("--min-confidence", type=float, default=0.9750)
+    parser.add_argument("--stats-every", type=float, default=5.0, help="Seconds between per-camera stats")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    import Face_recognition_teachable as frt
+    args = parse_args(argv)
+
+    model = frt.load_classifier(args.backend, args.min_confidence)
+    class_names = frt.load_class_names()
+    student_database = frt.load_student_database()
+
+    batcher = MicroBatcher(
+        lambda batch: model.predict(batch, batch_size=len(batch), verbose=0),
+        max_batch=args.max_batch,
+        max_wait_ms=args.max_wait_ms
+    )
+    batcher.start()
+
+    def on_result(source, index, frame, prediction, latency):
+        result = frt.evaluate_prediction(prediction, class_names, student_database, args.min_confidence)
+        name = result["name"] if result["name"] != "Unknown" else "Unknown Person"
+        print(f"[{source}] frame {index}\t{name}\tConfidence: {result['confidence']:.2%}\t"
+              f"Latency: {latency * 1000:.0f} ms")
+
+    recognizer = MultiCameraRecognizer(batcher, on_result, args.sources, args.every, args.change_threshold,
+                                       args.max_inflight, args.realtime)
+    recognizer.start()
+    last_stats = time.perf_counter()
+    try:
+        while recognizer.is_running():
+            recognizer.thread.join(0.1)
+            if time.perf_counter() - last_stats >= args.stats_every:
+                print(recognizer.format_stats(), file=sys.stderr)
+                last_stats = time.perf_counter()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recognizer.stop()
+        recognizer.thread.join(5)
+
+    for camera in recognizer.sources:
+        if camera.grabber.error:
+            print(f"[{camera.source}] Error: {camera.grabber.error}", file=sys.stderr)
+    print(recognizer.format_stats(), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from bulk_reevaluate import archive_images
+from preprocessing import INPUT_SIZE, BatchBuffer, fit_image, normalize_into, open_image
+from prediction_cache import file_hash
+
+# === Packed dataset ===
+# Decodes every image under train/<Name>/ and test/ once into a single
+# contiguous uint8 N x 224 x 224 x 3 file (images.u8) with a JSON index of
+# paths, labels, splits and content hashes. Readers memory-map the file and
+# slice batches from it directly - no per-image open/decode/resize. `pack`
+# is incremental: unchanged files are skipped by (mtime, size), changed files
+# are rewritten in place, new files fill the rows of removed ones or are
+# appended, and leftover holes are filled by moving the last rows down.
+
+PACK_DIR = "dataset_pack"
+IMAGE_SHAPE = (INPUT_SIZE[1], INPUT_SIZE[0], 3)
+ROW_BYTES = int(np.prod(IMAGE_SHAPE))
+
+def decode_uint8(path):
+    # Same center crop as preprocessing, kept as uint8 (4x smaller than the float tensor)
+    return np.asarray(fit_image(open_image(path)), dtype=np.uint8)
+
+class PackedDataset:
+    def __init__(self, directory=PACK_DIR):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        self.images_path = os.path.join(directory, "images.u8")
+        self.entries = []   # {"path", "label", "split", "hash", "mtime_ns", "size", "row"}
+        self.rows = 0       # rows in images.u8, always len(entries) after pack()
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+            self.entries, self.rows = index["entries"], index["rows"]
+        self._images = None
+        self._rows_by_hash = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def images(self):
+        # Read-only N x 224 x 224 x 3 uint8 view of the whole file
+        if self._images is None:
+            self._images = np.memmap(self.images_path, dtype=np.uint8, mode="r", shape=(self.rows,) + IMAGE_SHAPE)
+        return self._images
+
+    def pack(self, roots, rebuild=False):
+        # Returns (added, updated, removed) counts
+        os.makedirs(self.directory, exist_ok=True)
+        if rebuild:
+            self.entries, self.rows = [], 0
+        known = {entry["path"]: entry for entry in self.entries}
+        images = archive_images(roots)
+        current = {path for path, _ in images}
+        removed = [entry for entry in self.entries if entry["path"] not in current]
+        free_rows = sorted(entry["row"] for entry in removed)  # reused by new images
+        next_row = self.rows
+
+        writes = []  # (row, path)
+        entries, added, updated = [], 0, 0
+        for path, label in images:
+            stat = os.stat(path)
+            entry = known.get(path)
+            if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                entries.append(entry)
+                continue
+            digest = file_hash(path)
+            if entry and entry["hash"] == digest:
+                entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)  # touched, not changed
+                entries.append(entry)
+                continue
+            if entry:
+                row = entry["row"]
+                updated += 1
+            else:
+                if free_rows:
+                    row = free_rows.pop(0)
+                else:
+                    row, next_row = next_row, next_row + 1
+                added += 1
+            split = os.path.normpath(path).split(os.sep)[0]
+            entries.append({"path": path, "label": label, "split": split, "hash": digest,
+                            "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "row": row})
+            writes.append((row, path))
+
+        rows = max([self.rows] + [row + 1 for row, _ in writes])
+        # Rows of removed images that no new image took: move the last rows into
+        # those holes so the file always holds exactly len(entries) rows
+        by_row = {entry["row"]: entry for entry in entries}
+        holes = [row for row in range(len(entries)) if row not in by_row]
+        movers = sorted(row for row in by_row if row >= len(entries))
+        if writes or holes or rows != len(entries):
+            self._images = None
+            mode = "r+b" if os.path.exists(self.images_path) else "w+b"
+            with open(self.images_path, mode) as f:
+                f.truncate(rows * ROW_BYTES)
+            data = np.memmap(self.images_path, dtype=np.uint8, mode="r+", shape=(rows,) + IMAGE_SHAPE)
+            for row, path in writes:
+                data[row] = decode_uint8(path)
+            for hole, row in zip(holes, movers):
+                data[hole] = data[row]
+                by_row[row]["row"] = hole
+            data.flush()
+            del data
+            rows = len(entries)
+            with open(self.images_path, "r+b") as f:
+                f.truncate(rows * ROW_BYTES)
+        self.entries, self.rows = entries, rows
+        self._rows_by_hash = None
+        self.save()
+        return added, updated, len(removed)
+
+    def save(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"shape": list(IMAGE_SHAPE), "rows": self.rows, "entries": self.entries}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def select(self, split=None):
+        return [entry for entry in self.entries if split is None or entry["split"] == split]
+
+    def batches(self, entries, batch_size=32):
+        # Yields (entries, normalized float32 batch); uint8 rows come straight from the mapped file
+        buffer = BatchBuffer(batch_size)
+        images = self.images
+        for start in range(0, len(entries), batch_size):
+            chunk = entries[start:start + batch_size]
+            rows = np.array([entry["row"] for entry in chunk])
+            if rows[-1] - rows[0] == len(rows) - 1 and np.all(np.diff(rows) == 1):
+                pixels = images[rows[0]:rows[-1] + 1]  # contiguous: zero-copy slice
+            else:
+                pixels = images[rows]
+            yield chunk, normalize_into(pixels, buffer.view(len(chunk)))
+
+    def load_into(self, digest, out):
+        # Writes the normalized tensor for a content hash into `out`; False if it is not packed
+        if self._rows_by_hash is None:
+            self._rows_by_hash = {entry["hash"]: entry["row"] for entry in self.entries}
+        row = self._rows_by_hash.get(digest)
+        if row is None:
+            return False
+        normalize_into(self.images[row], out)
+        return True
+
+def evaluate(pack, model, class_names, split, batch_size, min_confidence):
+    from inference_backend import expected_label
+    entries = pack.select(split)
+    correct = 0
+    started = time.perf_counter()
+    for chunk, batch in pack.batches(entries, batch_size):
+        predictions = model.predict(batch, batch_size=len(chunk), verbose=0)
+        for entry, prediction in zip(chunk, predictions):
+            top_index = int(np.argmax(prediction))
+            predicted = class_names[top_index] if prediction[top_index] >= min_confidence else "Unknown"
+            expected = entry["label"] or expected_label(entry["path"], class_names)
+            correct += predicted == expected
+    elapsed = time.perf_counter() - started
+    return {"split": split or "all", "images": len(entries), "accuracy": correct / len(entries) if entries else 0.0,
+            "seconds": elapsed, "images_per_s": len(entries) / elapsed if elapsed else 0.0}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pack train/ and test/ into one memory-mapped uint8 array.")
+    parser.add_argument("--pack", default=PACK_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    pack_cmd = sub.add_parser("pack", help="Add new/changed images to the pack")
+    pack_cmd.add_argument("roots", nargs="*", default=["train", "test"])
+    pack_cmd.add_argument("--rebuild", action="store_true", help="Start a fresh pack")
+    eval_cmd = sub.add_parser("evaluate", help="Classify the packed images")
+    eval_cmd.add_argument("--split", default=None, help="train or test (default: everything)")
+    eval_cmd.add_argument("--batch-size", type=int, default=32)
+    eval_cmd.add_argument("--backend", default="keras", help="keras, direct, tflite[:path] or cascade[:first stage]")
+    eval_cmd.add_argument("--min-confidence", type=float, default=0.9750)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    pack = PackedDataset(args.pack)
+    if args.command == "pack":
+        started = time.perf_counter()
+        added, updated, removed = pack.pack(args.roots, rebuild=args.rebuild)
+        print(f"{len(pack)} image(s) packed in {pack.images_path}: {added} added, {updated} updated, "
+              f"{removed} removed ({time.perf_counter() - started:.1f}s)")
+        return
+
+    if not len(pack):
+        print(f"Error: '{args.pack}' is empty. Run 'python packed_dataset.py pack' first.", file=sys.stderr)
+        sys.exit(1)
+    from inference_backend import load_backend
+    with open("labels.txt", "r") as f:
+        class_names = [line.strip().split(" ", 1)[-1].strip() for line in f]
+    model = load_backend(args.backend, min_confidence=args.min_confidence)
+    result = evaluate(pack, model, class_names, args.split, args.batch_size, args.min_confidence)
+    print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
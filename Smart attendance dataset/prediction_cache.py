@@ -0,0 +1,166 @@
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+import numpy as np
+
+# === Persistent prediction cache ===
+# Maps a content hash of the image bytes to the model's softmax output, so
+# re-selecting the same file or re-running a batch over test/ skips decoding
+# and model.predict entirely. Rows are keyed by (model fingerprint, content
+# hash); the fingerprint covers keras_model.h5, labels.txt, the backend and
+# its .tflite file, so tools running different backends or models share one
+# cache file without ever seeing each other's predictions. A row can also hold
+# the image's backbone embedding (for the embedding index), so a repeat skips
+# both forward passes. Entries (including those of models no longer in use)
+# are evicted least recently used once the cache holds more than max_entries.
+
+CACHE_PATH = "prediction_cache.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    fingerprint TEXT NOT NULL,
+    key TEXT NOT NULL,
+    prediction BLOB NOT NULL,
+    embedding BLOB,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (fingerprint, key)
+);
+CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used);
+"""
+
+def content_hash(data):
+    # BLAKE2b is faster than SHA-256 on large JPEGs and plenty for cache keys
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return content_hash(f.read())
+
+class PredictionCache:
+    def __init__(self, fingerprint, path=CACHE_PATH, max_entries=10000):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    @classmethod
+    def for_model(cls, backend="keras", path=CACHE_PATH, max_entries=10000, min_confidence=None):
+        from inference_backend import backend_fingerprint
+        return cls(backend_fingerprint(backend, min_confidence=min_confidence), path, max_entries)
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        # {key: prediction} for the cached keys; refreshes their LRU position in one transaction
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self.lock:
+            for start in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for key, blob in self.conn.execute(
+                        f"SELECT key, prediction FROM predictions WHERE fingerprint = ? AND key IN ({placeholders})",
+                        [self.fingerprint] + chunk):
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                now = time.time()
+                self.conn.executemany("UPDATE predictions SET last_used = ? WHERE fingerprint = ? AND key = ?",
+                                      [(now, self.fingerprint, key) for key in found])
+                self.conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get_embedding(self, key):
+        # Embedding stored next to a cached prediction, or None
+        with self.lock:
+            row = self.conn.execute("SELECT embedding FROM predictions WHERE fingerprint = ? AND key = ?",
+                                    (self.fingerprint, key)).fetchone()
+        return None if row is None or row[0] is None else np.frombuffer(row[0], dtype=np.float32)
+
+    def put_embedding(self, key, embedding):
+        # Only attaches to an existing prediction row, which owns the LRU position
+        with self.lock:
+            self.conn.execute("UPDATE predictions SET embedding = ? WHERE fingerprint = ? AND key = ?",
+                              (np.asarray(embedding, dtype=np.float32).tobytes(), self.fingerprint, key))
+            self.conn.commit()
+
+    def put(self, key, prediction):
+        self.put_many([(key, prediction)])
+
+    def put_many(self, items):
+        # One transaction for a whole batch of predictions
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO predictions (fingerprint, key, prediction, last_used) VALUES (?, ?, ?, ?)",
+                [(self.fingerprint, key, np.asarray(prediction, dtype=np.float32).tobytes(), now)
+                 for key, prediction in items]
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        excess = self.conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM predictions WHERE rowid IN (SELECT rowid FROM predictions ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+
+    def __len__(self):
+        # Entries for this cache's fingerprint
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM predictions WHERE fingerprint = ?",
+                                     (self.fingerprint,)).fetchone()[0]
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM predictions WHERE fingerprint = ?", (self.fingerprint,))
+            self.conn.commit()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or clear the prediction cache.")
+    parser.add_argument("--cache", default=CACHE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show the number of cached predictions per model fingerprint")
+    sub.add_parser("clear", help="Remove every cached prediction")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.path.exists(args.cache):
+        print(f"Error: '{args.cache}' not found.", file=sys.stderr)
+        sys.exit(1)
+    conn = sqlite3.connect(args.cache)
+    try:
+        if args.command == "clear":
+            removed = conn.execute("DELETE FROM predictions").rowcount
+            conn.commit()
+            print(f"Removed {removed} cached prediction(s)")
+        else:
+            rows = conn.execute("SELECT fingerprint, COUNT(*) FROM predictions GROUP BY fingerprint "
+                                "ORDER BY MAX(last_used) DESC").fetchall()
+            print(f"{sum(count for _, count in rows)} cached prediction(s)")
+            for fingerprint, count in rows:
+                print(f"  model {fingerprint}: {count}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import io
+import os
+import glob
+import threading
+from collections import OrderedDict
+import numpy as np
+from PIL import Image, ImageOps
+
+# === Shared image preprocessing ===
+# One pipeline for the CLI, the UI, the batch tools and camera frames: decode
+# (optionally at reduced JPEG resolution), center-crop to 224x224 like the
+# Teachable Machine export, and normalize to [-1, 1] in place inside a
+# preallocated batch buffer.
+
+INPUT_SIZE = (224, 224)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# === Collect images from files, directories and glob patterns ===
+def collect_image_paths(inputs):
+    paths = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            for name in sorted(os.listdir(entry)):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.append(os.path.join(entry, name))
+        elif glob.has_magic(entry):
+            paths.extend(p for p in sorted(glob.glob(entry)) if p.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            paths.append(entry)
+    return paths
+
+def normalize_into(pixels, out):
+    # uint8 HxWx3 -> float32 in [-1, 1], written into `out` without temporary copies
+    np.multiply(pixels, 1 / 127.5, out=out, casting="unsafe")
+    out -= 1
+    return out
+
+def open_image(path, fast=True, min_size=INPUT_SIZE):
+    image = Image.open(path)
+    if fast and image.format == "JPEG":
+        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale while staying >= min_size
+        image.draft("RGB", min_size)
+    return image.convert("RGB")
+
+def fit_image(image, size=INPUT_SIZE):
+    return ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+
+class BatchBuffer:
+    # Reusable N x 224 x 224 x 3 float32 input buffer
+    def __init__(self, batch_size, size=INPUT_SIZE):
+        self.data = np.empty((batch_size, size[1], size[0], 3), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.data)
+
+    def view(self, count):
+        return self.data[:count]
+
+class PreprocessCache:
+    # LRU of preprocessed tensors keyed by (path, mtime, size); safe to share across threads
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(path):
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+    def get(self, key):
+        with self.lock:
+            tensor = self.entries.get(key)
+            if tensor is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return tensor
+
+    def put(self, key, tensor):
+        tensor = tensor.copy()
+        tensor.setflags(write=False)
+        with self.lock:
+            self.entries[key] = tensor
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+default_cache = PreprocessCache()
+
+def preprocess_image(image, out=None):
+    # PIL image -> normalized 224x224x3 tensor
+    if out is None:
+        out = np.empty((INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+    return normalize_into(np.asarray(fit_image(image)), out)
+
+def preprocess_path(path, out=None, cache=default_cache, fast=True, image=None):
+    # Decode + preprocess one file, reusing the cached tensor when the file hasn't changed.
+    # Callers that already decoded the file (e.g. for display) can pass it as `image`.
+    key = cache.key(path) if cache is not None else None
+    if key is not None:
+        tensor = cache.get(key)
+        if tensor is not None:
+            if out is None:
+                return tensor
+            out[...] = tensor
+            return out
+    out = preprocess_image(image if image is not None else open_image(path, fast=fast), out)
+    if key is not None:
+        cache.put(key, out)
+    return out
+
+def preprocess_array(rgb, out=None):
+    # RGB uint8 HxWx3 array (camera frame, face crop) -> same center crop as files
+    return preprocess_image(Image.fromarray(np.ascontiguousarray(rgb)), out)
+
+def preprocess_bgr(frame, out=None):
+    # OpenCV BGR capture buffer -> normalized tensor
+    return preprocess_array(frame[:, :, ::-1], out)
+
+def preprocess_bytes(data, out=None, fast=True):
+    # Encoded image bytes (e.g. an HTTP upload) -> normalized tensor
+    return preprocess_image(open_image(io.BytesIO(data), fast=fast), out)
+
+def load_batch(paths, buffer=None, cache=default_cache, fast=True):
+    # Fills the buffer with one row per path and returns the filled view
+    if buffer is None:
+        buffer = BatchBuffer(len(paths))
+    for row, path in enumerate(paths):
+        preprocess_path(path, buffer.data[row], cache=cache, fast=fast)
+    return buffer.view(len(paths))
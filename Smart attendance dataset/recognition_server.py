@@ -0,0 +1,273 @@
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from metrics import metrics
+from preprocessing import BatchBuffer, collect_image_paths, preprocess_bytes
+
+# === Headless recognition service ===
+# Door cameras POST image bytes to /classify. Each request is decoded on its
+# own handler thread, then handed to a micro-batching scheduler that
+# coalesces concurrent requests into one model.predict call (up to
+# --max-batch images, waiting at most --max-wait-ms for the batch to fill).
+# The response applies the same rules/min_confidence decision logic as
+# Face_recognition_teachable.py. GET /stats reports batching and GET /metrics
+# exposes stage timings and counters in Prometheus text format.
+
+MAX_BODY_BYTES = 20 * 1024 * 1024  # larger uploads are rejected before reading
+
+class MicroBatcher(threading.Thread):
+    def __init__(self, predict_batch, max_batch=16, max_wait_ms=5):
+        if max_batch < 1:
+            raise ValueError(f"Error: max_batch must be at least 1 (got {max_batch}).")
+        if max_wait_ms < 0:
+            raise ValueError(f"Error: max_wait_ms must not be negative (got {max_wait_ms}).")
+        super().__init__(daemon=True)
+        self.predict_batch = predict_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.buffer = BatchBuffer(max_batch)
+        self.batches = 0
+        self.images = 0
+
+    def submit(self, tensor):
+        future = Future()
+        self.requests.put((tensor, future))
+        return future
+
+    def _collect(self):
+        pending = [self.requests.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(pending) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                pending.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return pending
+
+    def run(self):
+        while True:
+            pending = self._collect()
+            for row, (tensor, _) in enumerate(pending):
+                self.buffer.data[row] = tensor
+            try:
+                with metrics.timer("predict_batch"):
+                    predictions = self.predict_batch(self.buffer.view(len(pending)))
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.images += len(pending)
+            for (_, future), prediction in zip(pending, predictions):
+                future.set_result(prediction)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "images": self.images,
+            "mean_batch_size": self.images / self.batches if self.batches else 0.0,
+            "queued": self.requests.qsize()
+        }
+
+class RecognitionService:
+    def __init__(self, batcher, evaluate, load_database, db_refresh=60.0):
+        # evaluate(prediction, student_database) -> result dict
+        self.batcher = batcher
+        self.evaluate = evaluate
+        self.load_database = load_database
+        self.db_refresh = db_refresh
+        self.db_lock = threading.Lock()
+        self.student_database = load_database()
+        self.db_loaded = time.monotonic()
+
+    def database(self):
+        # Counters change as marks are made elsewhere; re-read them periodically
+        with self.db_lock:
+            if time.monotonic() - self.db_loaded >= self.db_refresh:
+                self.student_database = self.load_database()
+                self.db_loaded = time.monotonic()
+            return self.student_database
+
+    def classify(self, data):
+        with metrics.timer("preprocess"):
+            tensor = preprocess_bytes(data)
+        with metrics.timer("queue_and_predict"):
+            prediction = self.batcher.submit(tensor).result()
+        result = self.evaluate(prediction, self.database())
+        metrics.inc("predictions")
+        if result["name"] == "Unknown":
+            metrics.inc("unknowns")
+        return result
+
+def make_handler(service, max_body=MAX_BODY_BYTES):
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            elif self.path == "/stats":
+                self._send_json(200, service.batcher.stats())
+            elif self.path == "/metrics":
+                body = metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            if self.path != "/classify":
+                self._send_json(404, {"error": "Not found"})
+                return
+            header = self.headers.get("Content-Length")
+            if header is None:
+                self.close_connection = True
+                self._send_json(411, {"error": "Content-Length required"})
+                return
+            try:
+                length = int(header)
+            except ValueError:
+                length = -1
+            if length < 0:
+                self.close_connection = True
+                self._send_json(400, {"error": "Invalid Content-Length"})
+                return
+            if length == 0:
+                self._send_json(400, {"error": "Empty request body"})
+                return
+            if length > max_body:
+                # The body is never read, so the connection can't be reused
+                self.close_connection = True
+                self._send_json(413, {"error": f"Request body larger than {max_body} bytes"})
+                return
+            data = self.rfile.read(length)
+            try:
+                result = service.classify(data)
+            except OSError:
+                self._send_json(400, {"error": "Could not open image file."})
+                return
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                return
+            self._send_json(200, result)
+
+        def log_message(self, format, *args):
+            pass  # one line per request would dominate the output under load
+
+    return Handler
+
+def serve(args):
+    import Face_recognition_teachable as frt
+    metrics.enabled = True  # exposed at GET /metrics
+    model = frt.load_classifier(min_confidence=args.min_confidence)
+    class_names = frt.load_class_names()
+
+    batcher = MicroBatcher(
+        lambda batch: model.predict(batch, batch_size=len(batch), verbose=0),
+        max_batch=args.max_batch,
+        max_wait_ms=args.max_wait_ms
+    )
+    batcher.start()
+    service = RecognitionService(
+        batcher,
+        lambda prediction, db: frt.evaluate_prediction(prediction, class_names, db, args.min_confidence),
+        frt.load_student_database,
+        db_refresh=args.db_refresh
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service, int(args.max_body_mb * 1024 * 1024)))
+    print(f"Serving on http://{args.host}:{args.port} (max batch {args.max_batch}, max wait {args.max_wait_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+# === Local load-test client ===
+def post_image(url, path):
+    with open(path, "rb") as f:
+        data = f.read()
+    request = urllib.request.Request(url + "/classify", data=data, headers={"Content-Type": "application/octet-stream"})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            result = json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        result = json.loads(e.read())
+    return path, result, time.perf_counter() - started
+
+def run_client(args):
+    paths = collect_image_paths(args.images) * args.repeat
+    started = time.perf_counter()
+    latencies = []
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for path, result, latency in executor.map(lambda p: post_image(args.url, p), paths):
+            latencies.append(latency)
+            if not args.quiet:
+                print(json.dumps({"path": path, **result}))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    with urllib.request.urlopen(args.url + "/stats") as response:
+        stats = json.loads(response.read())
+    print(f"{len(paths)} request(s) in {elapsed:.2f}s: {len(paths) / elapsed:.1f} req/s, "
+          f"p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.0f} ms, "
+          f"mean server batch {stats['mean_batch_size']:.1f}", file=sys.stderr)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless HTTP face recognition service.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_cmd = sub.add_parser("serve", help="Load the model and serve /classify")
+    serve_cmd.add_argument("--host", default="127.0.0.1")
+    serve_cmd.add_argument("--port", type=int, default=8000)
+    serve_cmd.add_argument("--max-batch", type=int, default=16, help="Most images per model.predict call")
+    serve_cmd.add_argument("--max-wait-ms", type=float, default=5.0, help="Longest wait for a batch to fill")
+    serve_cmd.add_argument("--min-confidence", type=float, default=0.9750)
+    serve_cmd.add_argument("--db-refresh", type=float, default=60.0, help="Seconds between student database reloads")
+    serve_cmd.add_argument("--max-body-mb", type=float, default=MAX_BODY_BYTES / (1024 * 1024),
+                           help="Largest accepted upload in MB")
+
+    client_cmd = sub.add_parser("client", help="Send images concurrently to a running server")
+    client_cmd.add_argument("images", nargs="+", help="Image files, directories or glob patterns")
+    client_cmd.add_argument("--url", default="http://127.0.0.1:8000")
+    client_cmd.add_argument("--concurrency", type=int, default=8)
+    client_cmd.add_argument("--repeat", type=int, default=1, help="Send every image this many times")
+    client_cmd.add_argument("--quiet", action="store_true", help="Only print the throughput summary")
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        if args.max_batch < 1:
+            parser.error("--max-batch must be at least 1")
+        if args.max_wait_ms < 0:
+            parser.error("--max-wait-ms must not be negative")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "serve":
+        serve(args)
+    else:
+        run_client(args)
+
+if __name__ == "__main__":
+    main()
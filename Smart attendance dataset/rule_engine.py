@@ -0,0 +1,74 @@
+import sys
+import json
+import argparse
+import numpy as np
+
+# === Vectorized consequence rules ===
+# The rule thresholds are sorted once into an array; a student's level is the
+# number of thresholds their absences reach, found with np.searchsorted. The
+# highest triggered rule wins (7 absences -> "Disciplinary action", not
+# "Warning"), and a whole roster is evaluated in one call.
+
+class RuleEngine:
+    def __init__(self, rules):
+        self.rules = sorted(rules, key=lambda rule: rule["threshold"])
+        self.thresholds = np.array([rule["threshold"] for rule in self.rules])
+        self.consequences = np.array([rule["consequence"] for rule in self.rules] + ["None"], dtype=object)
+
+    def levels(self, absences):
+        # Index of the highest rule reached for each absence count; -1 when none applies
+        return np.searchsorted(self.thresholds, np.asarray(absences), side="right") - 1
+
+    def consequences_for(self, absences):
+        # Level -1 picks the trailing "None"
+        return self.consequences[self.levels(absences)]
+
+    def rule_for(self, absences):
+        level = int(self.levels(absences))
+        return self.rules[level] if level >= 0 else None
+
+    def consequence(self, absences):
+        return self.consequences[int(self.levels(absences))]
+
+    def evaluate_roster(self, student_database):
+        # (names, absences, levels) for every student in one pass
+        names = list(student_database)
+        absences = np.fromiter((info.get("absences", 0) for info in student_database.values()),
+                               dtype=np.int64, count=len(names))
+        return names, absences, self.levels(absences)
+
+def roster_report(engine, student_database, flagged_only=False):
+    names, absences, levels = engine.evaluate_roster(student_database)
+    order = np.lexsort((np.array(names, dtype=str), -absences))  # most absences first, then by name
+    if flagged_only:
+        order = order[levels[order] >= 0]
+    rows = [
+        {"name": names[i], "id": student_database[names[i]]["id"], "absences": int(absences[i]),
+         "consequence": engine.consequences[levels[i]]}
+        for i in order
+    ]
+    counts = np.bincount(levels + 1, minlength=len(engine.rules) + 1)
+    summary = {"None": int(counts[0])}
+    summary.update({rule["consequence"]: int(count) for rule, count in zip(engine.rules, counts[1:])})
+    return rows, summary
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="End-of-term consequence report for the whole roster.")
+    parser.add_argument("--flagged", action="store_true", help="Only students who triggered a rule")
+    parser.add_argument("--json", action="store_true", help="Print one JSON record per student")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    import Face_recognition_teachable as frt
+    args = parse_args(argv)
+    engine = RuleEngine(frt.rules)
+    rows, summary = roster_report(engine, frt.load_student_database(), args.flagged)
+    for row in rows:
+        if args.json:
+            print(json.dumps(row))
+        else:
+            print(f"{row['name']}\tID: {row['id']}\tAbsences: {row['absences']}\tConsequence: {row['consequence']}")
+    print(", ".join(f"{consequence}: {count}" for consequence, count in summary.items()), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
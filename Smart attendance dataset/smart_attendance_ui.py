@@ -1,52 +1,95 @@
+import time
+STARTUP_TIME = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from PIL import Image, ImageTk
 from datetime import datetime
 import numpy as np
 import os
-from keras.models import load_model
-import cv2
-import json
 import os.path
+import queue
+import argparse
+from inference_backend import BACKENDS, load_backend
+from inference_worker import InferenceWorker
+from live_recognition import LiveRecognizer
+from face_detection import FaceDetector, classify_faces, draw_faces
+from embedding_index import EmbeddingIndex, build_feature_extractor, extract_embeddings, load_image_batch
+from preprocessing import BatchBuffer, open_image, preprocess_path
+from student_store import StudentStore
+from attendance_log import AttendanceLog, compact, make_event
+from attendance_session import AttendanceSession
+from metrics import metrics
+from rule_engine import RuleEngine
+from prediction_cache import PredictionCache, file_hash
 
 # Load class labels
 with open("labels.txt", "r") as f:
     class_names = [line.strip().split(' ', 1)[-1].strip() for line in f]
 
-# Database functions - MODIFIED TO INCLUDE PRESENCE COUNT
-def load_student_database():
-    if os.path.exists("student_database.json"):
-        try:
-            with open("student_database.json", "r") as f:
-                db = json.load(f)
-                # Add presences field if missing (backward compatibility)
-                for student in db.values():
-                    if "presences" not in student:
-                        student["presences"] = 0
-                return db
-        except Exception as e:
-            print("❌ Error loading student_database.json:", str(e))
-            return {}
-    else:
-        print("❌ student_database.json not found.")
-        return {}
-
-def save_student_database(db):
-    with open("student_database.json", "w") as f:
-        json.dump(db, f, indent=2)
-
-# Initialize database and model
-student_database = load_student_database()
-attendance_records = []
+# Database - students live in SQLite (seeded from student_database.json on first run).
+# Marks are appended to the attendance event log; the stored counters are rebuilt from
+# it by compaction (at startup, periodically and on exit). student_database is the
+# in-memory view, kept current on every mark.
+student_store = StudentStore.open()
+compact(student_store)
+student_database = student_store.load_all()
+attendance_log = AttendanceLog()
+COMPACT_INTERVAL_MS = 10 * 60 * 1000
+DB_PAGE_SIZE = 500  # Manage Student detail shows the roster one page at a time
+
+def log_attendance(name, student_id, status, source, confidence=None, box=None):
+    # One sequential append per mark instead of a database write
+    event = make_event(name, student_id, status, source, confidence, box=box)
+    with metrics.timer("db_write"):
+        metrics.inc("db_write_bytes", attendance_log.append(event))
+    metrics.inc("marks")
+    counter = {"Absent": "absences", "Present": "presences"}.get(status)
+    if counter:
+        student_database[name][counter] += 1
+    return event
+
+# Initialize session and model
+# Session marks with O(1) duplicate and id indexes; attendance_records is the ordered list
+session = AttendanceSession(student_database)
+attendance_records = session.records
 rules = [
     {"rule": "3 unexcused absences = warning", "threshold": 3, "consequence": "Warning"},
     {"rule": "5 unexcused absences = meeting", "threshold": 5, "consequence": "Meeting with supervisor"},
     {"rule": "7 unexcused absences = disciplinary action", "threshold": 7, "consequence": "Disciplinary action"}
 ]
-model = load_model("keras_model.h5", compile=False) if os.path.exists("keras_model.h5") else None
+rule_engine = RuleEngine(rules)
+
+model_backend = "keras"  # or "direct" / "tflite[:path]" via --backend (see inference_backend.py)
+min_confidence = 0.95  # softmax confidence needed to name a student (also the cascade's gate)
+
+def load_face_model():
+    # Runs on the inference worker: keras/TensorFlow is only imported here, so the
+    # window can draw before the heavy imports and model deserialization happen
+    global prediction_cache
+    if not os.path.exists("keras_model.h5"):
+        return None
+    model = load_backend(model_backend, min_confidence=min_confidence)
+    prediction_cache = PredictionCache.for_model(model_backend, min_confidence=min_confidence)
+    return model
+
+prediction_cache = None  # opened with the model: entries are only valid for this model + backend
+
+inference_worker = InferenceWorker(load_face_model)
+face_detector = None  # created on first group photo (on the inference worker)
+embedding_index = EmbeddingIndex.load()
+feature_extractor = None  # built from the model on first use (on the inference worker)
+min_similarity = 0.80
+classify_buffer = BatchBuffer(1)  # reused by every single-image classification (worker thread only)
+
+def get_feature_extractor(model):
+    global feature_extractor
+    if feature_extractor is None:
+        feature_extractor = build_feature_extractor(model)
+    return feature_extractor
 
 class IAESApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, measure_startup=False):
         super().__init__()
         self.title("Intelligent Attendance Evaluation System (IAES)")
         self.geometry("1200x800")
@@ -60,6 +103,51 @@ class IAESApp(tk.Tk):
 
         self.show_frame(WelcomePage)
 
+        # Start loading the model in the background once the window is up, and deliver worker results
+        self.after_idle(inference_worker.ensure_started)
+        inference_worker.poll(self)
+
+        # Flush batched log fsyncs every second, fold the log into the store periodically
+        self.after(1000, self.sync_attendance_log)
+        self.after(COMPACT_INTERVAL_MS, self.compact_attendance_log)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        if measure_startup:
+            self.after_idle(self.report_startup)
+
+    def sync_attendance_log(self):
+        attendance_log.sync()
+        self.after(1000, self.sync_attendance_log)
+
+    def compact_attendance_log(self):
+        attendance_log.sync()
+        with metrics.timer("compact"):
+            compact(student_store)
+        self.after(COMPACT_INTERVAL_MS, self.compact_attendance_log)
+
+    def on_close(self):
+        attendance_log.close()
+        compact(student_store)
+        student_store.close()
+        self.destroy()
+
+    def report_startup(self):
+        # Called once the event loop is idle, i.e. the first screen is drawn and accepts input
+        interactive = time.perf_counter() - STARTUP_TIME
+        print(f"Window interactive after {interactive:.3f}s")
+        self.wait_for_model()
+
+    def wait_for_model(self):
+        if not inference_worker.ready.is_set():
+            self.after(100, self.wait_for_model)
+            return
+        if inference_worker.model is not None:
+            print(f"Model ready after {time.perf_counter() - STARTUP_TIME:.3f}s "
+                  f"(load + warm-up {inference_worker.load_seconds:.3f}s)")
+        else:
+            print(inference_worker.unavailable_reason())
+        self.destroy()
+
     def show_frame(self, page):
         frame = self.frames[page]
         frame.tkraise()
@@ -114,6 +202,7 @@ class AttendancePage(tk.Frame):
         self.notebook.add(self.face_recognition_tab, text="Face Recognition")
         self.notebook.add(self.manual_entry_tab, text="Manual Entry")
         self.notebook.add(self.manage_db_tab, text="Manage Student detail")
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
         
         self.setup_face_recognition_tab()
         self.setup_manual_entry_tab()
@@ -128,11 +217,17 @@ class AttendancePage(tk.Frame):
         
         self.attendance_display = tk.Text(display_frame, height=15, width=120, font=("Arial", 12))
         self.attendance_display.pack(pady=5)
+        self.update_display()
         
         # Action Buttons
         button_frame = tk.Frame(self, bg="#e6f2ff")
         button_frame.pack(pady=10)
         
+    def on_tab_changed(self, event):
+        # First use of the Face Recognition tab starts model loading if it hasn't begun yet
+        if self.notebook.index("current") == 0:
+            inference_worker.ensure_started()
+
     def setup_face_recognition_tab(self):
         tab = self.face_recognition_tab
         tab.configure(style="TFrame")
@@ -170,6 +265,28 @@ class AttendancePage(tk.Frame):
             width=15
         )
         btn_select.pack(side="left", padx=10)
+
+        self.btn_live = tk.Button(
+            btn_frame,
+            text="Live Recognition",
+            font=("Arial", 12),
+            bg="#2196F3",
+            fg="#ffffff",
+            command=self.toggle_live_recognition,
+            width=15
+        )
+        self.btn_live.pack(side="left", padx=10)
+
+        btn_group = tk.Button(
+            btn_frame,
+            text="Group Photo",
+            font=("Arial", 12),
+            bg="#2196F3",
+            fg="#ffffff",
+            command=self.select_group_photo,
+            width=15
+        )
+        btn_group.pack(side="left", padx=10)
         
         # Detection results
         self.result_label = tk.Label(btn_frame, text="", font=("Arial", 12), fg="#003366")
@@ -201,6 +318,11 @@ class AttendancePage(tk.Frame):
         )
         btn_absent.pack(side="left", padx=5)
 
+        # Live recognition FPS / latency
+        self.live_stats_label = tk.Label(tab, text="", font=("Arial", 10), fg="#555555")
+        self.live_stats_label.pack(pady=2)
+        self.live_recognizer = None
+
     def setup_manual_entry_tab(self):
         tab = self.manual_entry_tab
         form_frame = tk.Frame(tab)
@@ -266,10 +388,9 @@ class AttendancePage(tk.Frame):
             messagebox.showerror("Error", "Unknown person detected. Use Manage Student detail.")
             return
 
-        for record in attendance_records:
-            if record["name"] == self.detected_name:
-                messagebox.showerror("Error", f"Attendance for {self.detected_name} has already been marked.")
-                return
+        if session.is_marked(self.detected_name):
+            messagebox.showerror("Error", f"Attendance for {self.detected_name} has already been marked.")
+            return
 
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         record = {
@@ -278,22 +399,18 @@ class AttendancePage(tk.Frame):
             "status": status,
             "time": timestamp
         }
-        attendance_records.append(record)
+        session.mark(record)
 
         if self.detected_name in student_database:
             # MODIFIED: Update both absences and presences
-            if status == "Absent":
-                student_database[self.detected_name]["absences"] += 1
-            elif status == "Present":
-                student_database[self.detected_name]["presences"] += 1
-                
-            save_student_database(student_database)
+            log_attendance(self.detected_name, self.detected_id, status, "face", self.detected_confidence)
         else:
             messagebox.showerror("Error", f"{self.detected_name} not found in the database.")
             return
 
         explanation = self.infer_consequence(self.detected_name)
-        self.update_display()
+        self.append_attendance_record(record)
+        self.tree_update_student(self.detected_name)
 
         message = f"Attendance marked for {self.detected_name} as {status}."
         if explanation:
@@ -374,8 +491,18 @@ class AttendancePage(tk.Frame):
         self.db_tree.configure(yscrollcommand=scrollbar.set)
         
         self.db_tree.pack(fill="both", expand=True)
+
+        # Paging controls - only one page of rows lives in the Treeview at a time
+        page_frame = tk.Frame(db_display_frame)
+        page_frame.pack(pady=5)
+        tk.Button(page_frame, text="< Prev", font=("Arial", 10), command=lambda: self.change_db_page(-1)).pack(side="left")
+        self.db_page_label = tk.Label(page_frame, text="", font=("Arial", 10), fg="#003366")
+        self.db_page_label.pack(side="left", padx=10)
+        tk.Button(page_frame, text="Next >", font=("Arial", 10), command=lambda: self.change_db_page(1)).pack(side="left")
         
         # Populate the treeview
+        self.db_order = list(student_database.keys())
+        self.db_page = 0
         self.populate_db_tree()
         
         # Delete button
@@ -391,21 +518,103 @@ class AttendancePage(tk.Frame):
             command=self.delete_selected_student,
             width=15
         )
-        btn_delete.pack()
+        btn_delete.pack(side="left", padx=5)
+
+        btn_enroll = tk.Button(
+            btn_frame,
+            text="Enroll Photos",
+            font=("Arial", 12),
+            bg="#2196F3",
+            fg="#ffffff",
+            command=self.enroll_selected_student,
+            width=15
+        )
+        btn_enroll.pack(side="left", padx=5)
+
+        btn_import = tk.Button(
+            btn_frame,
+            text="Import Roster",
+            font=("Arial", 12),
+            bg="#4CAF50",
+            fg="#ffffff",
+            command=self.import_roster,
+            width=15
+        )
+        btn_import.pack(side="left", padx=5)
+
+        btn_export = tk.Button(
+            btn_frame,
+            text="Export Roster",
+            font=("Arial", 12),
+            bg="#607D8B",
+            fg="#ffffff",
+            command=self.export_roster,
+            width=15
+        )
+        btn_export.pack(side="left", padx=5)
 
     def populate_db_tree(self):
-        # Clear existing items
-        for item in self.db_tree.get_children():
-            self.db_tree.delete(item)
+        # Full redraw of the current page only (initial load and page changes)
+        self.db_tree.delete(*self.db_tree.get_children())
         
         # Add students from database - MODIFIED: Added presences
-        for name, info in student_database.items():
-            self.db_tree.insert("", "end", values=(
-                name, 
-                info["id"], 
-                info["absences"],
-                info.get("presences", 0)  # Use get for backward compatibility
-            ))
+        start = self.db_page * DB_PAGE_SIZE
+        for name in self.db_order[start:start + DB_PAGE_SIZE]:
+            self.tree_insert_row(name)
+        self.update_db_page_label()
+
+    def db_row_values(self, name):
+        info = student_database[name]
+        return (
+            name, 
+            info["id"], 
+            info["absences"],
+            info.get("presences", 0)  # Use get for backward compatibility
+        )
+
+    def tree_insert_row(self, name):
+        # Rows are keyed by student id
+        self.db_tree.insert("", "end", iid=str(student_database[name]["id"]), values=self.db_row_values(name))
+
+    def update_db_page_label(self):
+        pages = max(1, -(-len(self.db_order) // DB_PAGE_SIZE))
+        self.db_page_label.config(text=f"Page {self.db_page + 1} of {pages} ({len(self.db_order)} students)")
+
+    def change_db_page(self, step):
+        pages = max(1, -(-len(self.db_order) // DB_PAGE_SIZE))
+        page = min(max(self.db_page + step, 0), pages - 1)
+        if page != self.db_page:
+            self.db_page = page
+            self.populate_db_tree()
+
+    def tree_add_student(self, name):
+        # New students go to the end; only the last page needs a row
+        self.db_order.append(name)
+        if len(self.db_order) - 1 < (self.db_page + 1) * DB_PAGE_SIZE:
+            self.tree_insert_row(name)
+        self.update_db_page_label()
+
+    def tree_update_student(self, name):
+        iid = str(student_database[name]["id"])
+        if self.db_tree.exists(iid):
+            self.db_tree.item(iid, values=self.db_row_values(name))
+
+    def tree_delete_student(self, name, student_id):
+        position = self.db_order.index(name)
+        self.db_order.pop(position)
+        if self.db_tree.exists(str(student_id)):
+            self.db_tree.delete(str(student_id))
+            # Pull the first row of the next page up so the page stays full
+            pulled = (self.db_page + 1) * DB_PAGE_SIZE - 1
+            if pulled < len(self.db_order):
+                self.tree_insert_row(self.db_order[pulled])
+        elif position < self.db_page * DB_PAGE_SIZE:
+            # An earlier page shrank; the visible window shifts by one row
+            self.populate_db_tree()
+        if self.db_page * DB_PAGE_SIZE >= len(self.db_order) and self.db_page > 0:
+            self.db_page -= 1
+            self.populate_db_tree()
+        self.update_db_page_label()
 
     def add_new_student(self):
         name = self.new_name_var.get().strip()
@@ -432,23 +641,25 @@ class AttendancePage(tk.Frame):
             messagebox.showerror("Error", "Student name already exists in database")
             return
             
-        for student_info in student_database.values():
-            if student_info["id"] == student_id:
-                messagebox.showerror("Error", "Student ID already exists in database")
-                return
+        if session.id_taken(student_id):
+            messagebox.showerror("Error", "Student ID already exists in database")
+            return
         
         # Add to database - MODIFIED: Added presences
+        try:
+            student_store.add(name, student_id, int(absences), int(presences))
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
         student_database[name] = {
             "id": student_id,
             "absences": int(absences),
             "presences": int(presences)
         }
-        
-        # Save to file
-        save_student_database(student_database)
+        session.add_student(name, student_id)
         
         # Update UI
-        self.populate_db_tree()
+        self.tree_add_student(name)
         self.update_manual_entry_combobox()
         
         # Clear form
@@ -459,6 +670,47 @@ class AttendancePage(tk.Frame):
         
         messagebox.showinfo("Success", f"Added new student: {name}")
 
+    def import_roster(self):
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Roster Files", "*.csv;*.jsonl")],
+            title="Import Roster"
+        )
+        if not file_path:
+            return
+        try:
+            count = student_store.import_roster(file_path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Roster not imported: {e}")
+            return
+
+        # Only the new rows are pulled in; existing students keep their in-memory counters
+        for name, info in student_store.load_all().items():
+            if name not in student_database:
+                student_database[name] = info
+                session.add_student(name, info["id"])
+                self.db_order.append(name)
+        self.populate_db_tree()
+        self.update_manual_entry_combobox()
+        messagebox.showinfo("Success", f"Imported {count} student(s)")
+
+    def export_roster(self):
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl")],
+            title="Export Roster"
+        )
+        if not file_path:
+            return
+        # Fold pending marks into the stored counters so the export is current
+        attendance_log.sync()
+        compact(student_store)
+        try:
+            count = student_store.export_roster(file_path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Roster not exported: {e}")
+            return
+        messagebox.showinfo("Success", f"Exported {count} student(s) to {file_path}")
+
     def delete_selected_student(self):
         selected = self.db_tree.selection()
         if not selected:
@@ -470,18 +722,60 @@ class AttendancePage(tk.Frame):
         name = item["values"][0]
         
         if messagebox.askyesno("Confirm", f"Delete student {name}? This cannot be undone."):
-            # Remove from database
+            # Remove from database (pending marks are folded in first so they can't
+            # land on a student later re-added under the same name)
+            attendance_log.sync()
+            compact(student_store)
+            student_id = student_database[name]["id"]
+            student_store.delete(name)
+            session.remove_student(name, student_id)
             del student_database[name]
-            
-            # Save to file
-            save_student_database(student_database)
+
+            # Drop the enrolled centroid too; the index is owned by the inference worker
+            if name in embedding_index.rows:
+                inference_worker.submit(
+                    lambda model: embedding_index.remove(name) and embedding_index.save(),
+                    lambda result, error: None
+                )
             
             # Update UI
-            self.populate_db_tree()
+            self.tree_delete_student(name, student_id)
             self.update_manual_entry_combobox()
             
             messagebox.showinfo("Success", f"Deleted student: {name}")
 
+    def enroll_selected_student(self):
+        selected = self.db_tree.selection()
+        if not selected:
+            messagebox.showerror("Error", "Please select a student to enroll")
+            return
+        if not inference_worker.available():
+            messagebox.showerror("Error", inference_worker.unavailable_reason())
+            return
+        name = str(self.db_tree.item(selected[0])["values"][0])
+
+        file_paths = filedialog.askopenfilenames(
+            filetypes=[("Image Files", "*.jpg;*.jpeg;*.png")],
+            title=f"Select photos of {name}"
+        )
+        if not file_paths:
+            return
+
+        def enroll(model):
+            # Only the new photos go through the backbone; the index is updated and saved in place
+            embeddings = extract_embeddings(get_feature_extractor(model), load_image_batch(list(file_paths)))
+            embedding_index.enroll(name, embeddings)
+            embedding_index.save()
+            return len(file_paths)
+
+        def done(count, error):
+            if error is not None:
+                messagebox.showerror("Error", f"Enrollment failed: {error}")
+            else:
+                messagebox.showinfo("Success", f"Enrolled {count} photo(s) for {name}")
+
+        inference_worker.submit(enroll, done)
+
     def update_manual_entry_combobox(self):
         student_names = list(student_database.keys())
         student_names.sort()
@@ -504,10 +798,11 @@ class AttendancePage(tk.Frame):
         self.combo_status.set("Present")  # Default to Present
 
     def capture_image(self):
-        if not model:
-            messagebox.showerror("Error", "Model not found. Face recognition disabled.")
+        if not inference_worker.available():
+            messagebox.showerror("Error", inference_worker.unavailable_reason())
             return
-            
+
+        import cv2  # deferred: only the capture path needs OpenCV
         cap = cv2.VideoCapture(0)
         if not cap.isOpened():
             messagebox.showerror("Error", "Could not open camera.")
@@ -516,7 +811,8 @@ class AttendancePage(tk.Frame):
         messagebox.showinfo("Camera", "Press 's' to save the image and close, or 'q' to quit without saving.")
 
         while True:
-            ret, frame = cap.read()
+            with metrics.timer("camera_read"):
+                ret, frame = cap.read()
             if not ret:
                 break
 
@@ -525,7 +821,8 @@ class AttendancePage(tk.Frame):
             key = cv2.waitKey(1) & 0xFF
             if key == ord('s'):
                 img_path = "captured_image.jpg"
-                cv2.imwrite(img_path, frame)
+                with metrics.timer("image_write"):
+                    cv2.imwrite(img_path, frame)
                 cap.release()
                 cv2.destroyAllWindows()
                 self.classify_from_path(img_path)
@@ -536,8 +833,8 @@ class AttendancePage(tk.Frame):
                 break
 
     def select_and_classify(self):
-        if not model:
-            messagebox.showerror("Error", "Model not found. Face recognition disabled.")
+        if not inference_worker.available():
+            messagebox.showerror("Error", inference_worker.unavailable_reason())
             return
             
         file_path = filedialog.askopenfilename(
@@ -548,15 +845,30 @@ class AttendancePage(tk.Frame):
             self.classify_from_path(file_path)
 
     def classify_from_path(self, file_path):
-        try:
-            img = Image.open(file_path).convert("RGB")
-        except:
-            messagebox.showerror("Error", "Could not open image file.")
-            return
-            
+        # Decode, resize and predict on the inference worker; the UI stays responsive meanwhile
+        queued = inference_worker.pending()
+        status = "Classifying..." if queued == 0 else f"Classifying... ({queued} ahead in queue)"
+        if not inference_worker.ready.is_set():
+            status += "\nWarming up model"
+        self.result_label.config(text=status)
+        submitted = time.perf_counter()
+
+        def done(result, error):
+            # Queue wait + worker time, as the operator experiences it
+            metrics.observe("classify_total", time.perf_counter() - submitted)
+            self.show_classification(result, error)
+
+        inference_worker.submit(lambda model: self.run_classification(model, file_path), done)
+
+    def run_classification(self, model, file_path):
+        # Runs on the inference worker thread - must not touch Tk widgets
         # Set maximum display dimensions
         max_display_width = 400
         max_display_height = 300
+
+        # Large camera JPEGs are decoded at reduced size; the display never needs more than 400x300
+        with metrics.timer("decode"):
+            img = open_image(file_path, min_size=(max_display_width, max_display_height))
         
         # Calculate the aspect ratio
         width, height = img.size
@@ -579,29 +891,81 @@ class AttendancePage(tk.Frame):
             new_width = int(new_height * aspect_ratio)
         
         # Resize for display
-        img_display = img.resize((new_width, new_height), Image.LANCZOS)
+        with metrics.timer("display_resize"):
+            img_display = img.resize((new_width, new_height), Image.LANCZOS)
+
+        # A file seen before (same bytes, same model) skips preprocessing and predict
+        key = file_hash(file_path)
+        prediction = prediction_cache.get(key)
+        img_array = classify_buffer.view(1)
+        preprocessed = prediction is None
+        if prediction is None:
+            # Preprocess for the model into the reusable buffer (cached by file path + mtime)
+            with metrics.timer("preprocess"):
+                preprocess_path(file_path, classify_buffer.data[0], image=img)
+
+            # Predict
+            with metrics.timer("predict"):
+                prediction = model.predict(img_array, verbose=0)[0]
+            metrics.inc("predictions")
+            prediction_cache.put(key, prediction)
+        else:
+            metrics.inc("prediction_cache_hits")
+        class_index = int(np.argmax(prediction))
+        confidence = float(prediction[class_index])
+
+        # Students enrolled by photo aren't in the softmax head, which would confidently
+        # name an existing class instead - so the index is consulted whenever it has entries.
+        # The embedding is cached with the prediction, so a repeat skips the backbone too.
+        match = None
+        if len(embedding_index):
+            with metrics.timer("embedding_lookup"):
+                embedding = prediction_cache.get_embedding(key)
+                if embedding is None:
+                    if not preprocessed:
+                        preprocess_path(file_path, classify_buffer.data[0], image=img)
+                    embedding = extract_embeddings(get_feature_extractor(model), img_array)[0]
+                    prediction_cache.put_embedding(key, embedding)
+                match = embedding_index.identify(embedding[None, :], min_similarity)[0]
+        return img_display, class_index, confidence, match
+
+    def show_classification(self, result, error):
+        if error is not None:
+            self.result_label.config(text="")
+            if not inference_worker.available():
+                messagebox.showerror("Error", inference_worker.unavailable_reason())
+            elif isinstance(error, OSError):
+                messagebox.showerror("Error", "Could not open image file.")
+            else:
+                messagebox.showerror("Error", f"Classification failed: {error}")
+            return
+
+        img_display, class_index, confidence, match = result
         photo = ImageTk.PhotoImage(img_display)
         
         # Update image label
         self.image_label.config(image=photo)
         self.image_label.image = photo
 
-        # Resize for model processing
-        img_resized = img.resize((224, 224))
-        img_array = np.array(img_resized).astype(np.float32)
-        img_array = (img_array / 127.5) - 1
-        img_array = np.expand_dims(img_array, axis=0)
-        
-        # Predict
-        predictions = model.predict(img_array)
-        class_index = int(np.argmax(predictions[0]))
-        confidence = float(predictions[0][class_index])
+        self.apply_detection(class_index, confidence, match)
+        self.notebook.select(0)  # Switch to face recognition tab
 
-        # Confidence threshold
-        min_confidence = 0.95
-        
-        if confidence >= min_confidence:
-            detected_label = class_names[class_index]
+    def apply_detection(self, class_index, confidence, match=None):
+        detected_label = None
+        softmax_label = class_names[class_index] if confidence >= min_confidence else None
+        if (match and match[0] != "Unknown" and match[0] != softmax_label
+                and (softmax_label is None or match[0] not in class_names)):
+            # An embedding match above min_similarity names a student the softmax head doesn't
+            # know (enrolled by photo), or one the head isn't confident about
+            detected_label, similarity = match
+            score_text = f"Embedding Similarity: {similarity:.2%}"
+            self.detected_confidence = similarity
+        elif softmax_label:
+            detected_label = softmax_label
+            score_text = f"Confidence Score: {confidence:.2%}"
+            self.detected_confidence = confidence
+
+        if detected_label:
             self.detected_name = detected_label
             self.detected_id = student_database.get(detected_label, {}).get("id", "")
             absences = student_database.get(detected_label, {}).get("absences", 0)
@@ -611,18 +975,150 @@ class AttendancePage(tk.Frame):
                 f"Detected: {self.detected_name}\n"
                 f"ID: {self.detected_id if self.detected_id else 'N/A'}\n"
                 f"Absences: {absences} | Presences: {presences}\n"  # MODIFIED
-                f"Confidence Score: {confidence:.2%}")
+                f"{score_text}")
         else:
+            metrics.inc("unknowns")
             self.detected_name = "Unknown"
             self.detected_id = ""
+            self.detected_confidence = confidence
             result_text = (
                 "Unknown Person\n"
                 "Confidence Score: 0.00%\n"
                 "Please use Manage Student detail")
             
         self.result_label.config(text=result_text)
+
+    def select_group_photo(self):
+        if not inference_worker.available():
+            messagebox.showerror("Error", inference_worker.unavailable_reason())
+            return
+
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Image Files", "*.jpg;*.jpeg;*.png")],
+            title="Select a Group Photo"
+        )
+        if file_path:
+            self.result_label.config(text="Detecting faces...")
+            inference_worker.submit(
+                lambda model: self.run_group_classification(model, file_path),
+                self.show_group_results
+            )
+
+    def run_group_classification(self, model, file_path):
+        # Runs on the inference worker thread: detect every face, classify all crops in one predict
+        global face_detector
+        if face_detector is None:
+            face_detector = FaceDetector()
+        img = Image.open(file_path).convert("RGB")
+        faces = classify_faces(np.asarray(img), face_detector, lambda batch: model.predict(batch, verbose=0))
+        return img, faces
+
+    def show_group_results(self, result, error):
+        if error is not None:
+            self.result_label.config(text="")
+            if isinstance(error, OSError) and not isinstance(error, FileNotFoundError):
+                messagebox.showerror("Error", "Could not open image file.")
+            else:
+                messagebox.showerror("Error", str(error))
+            return
+
+        img, faces = result
+        labels = []
+        marked, already_marked = [], []
+        # One attendance record per recognized face, made durable with a single fsync
+        for box, class_index, confidence in faces:
+            name = class_names[class_index] if confidence >= min_confidence else "Unknown"
+            labels.append(name if name == "Unknown" else f"{name} {confidence:.0%}")
+            if name == "Unknown" or name not in student_database:
+                continue
+            if self.record_attendance(name, student_database[name]["id"], "Present", "face", confidence, box):
+                marked.append(name)
+            else:
+                already_marked.append(name)
+        if marked:
+            attendance_log.sync()
+
+        img_display = draw_faces(img, faces, labels)
+        img_display.thumbnail((400, 300), Image.LANCZOS)
+        photo = ImageTk.PhotoImage(img_display)
+        self.image_label.config(image=photo)
+        self.image_label.image = photo
+
+        unknown = sum(1 for label in labels if label == "Unknown")
+        self.result_label.config(text=(
+            f"Faces detected: {len(faces)}\n"
+            f"Marked present: {', '.join(marked) if marked else 'None'}\n"
+            f"Already marked: {len(already_marked)} | Unknown: {unknown}"))
         self.notebook.select(0)  # Switch to face recognition tab
 
+    def record_attendance(self, name, student_id, status, source, confidence=None, box=None):
+        # Adds the session record and logs the mark (with the face box for group photos); False if already marked
+        if session.is_marked(name):
+            return False
+
+        event = log_attendance(name, student_id, status, source, confidence, box)
+        record = {"name": name, "id": student_id, "status": status, "time": event["time"]}
+        session.mark(record)
+        self.append_attendance_record(record)
+        self.tree_update_student(name)
+        return True
+
+    def toggle_live_recognition(self):
+        if self.live_recognizer:
+            self.stop_live_recognition()
+            return
+        if not inference_worker.available():
+            messagebox.showerror("Error", inference_worker.unavailable_reason())
+            return
+
+        # Frames are classified from memory on the inference worker; results come back through a queue
+        self.live_results = queue.Queue()
+        self.live_recognizer = LiveRecognizer(
+            lambda batch: inference_worker.run_sync(lambda model: model.predict(batch, verbose=0)),
+            lambda index, frame, prediction, latency: self.live_results.put(prediction),
+            source=0,
+            every_n=5
+        )
+        self.live_recognizer.start()
+        self.btn_live.config(text="Stop Live")
+        self.poll_live_recognition()
+
+    def stop_live_recognition(self):
+        if self.live_recognizer:
+            self.live_recognizer.stop()
+        self.live_recognizer = None
+        self.btn_live.config(text="Live Recognition")
+
+    def poll_live_recognition(self):
+        recognizer = self.live_recognizer
+        if recognizer is None:
+            return
+
+        latest = recognizer.grabber.latest
+        if latest is not None:
+            img_display = Image.fromarray(latest[2][:, :, ::-1])
+            img_display.thumbnail((400, 300), Image.BILINEAR)
+            photo = ImageTk.PhotoImage(img_display)
+            self.image_label.config(image=photo)
+            self.image_label.image = photo
+
+        while True:
+            try:
+                prediction = self.live_results.get_nowait()
+            except queue.Empty:
+                break
+            class_index = int(np.argmax(prediction))
+            self.apply_detection(class_index, float(prediction[class_index]))
+
+        self.live_stats_label.config(text=recognizer.stats.format(recognizer.grabber))
+
+        if not recognizer.is_running():
+            self.stop_live_recognition()
+            if recognizer.error:
+                messagebox.showerror("Error", str(recognizer.error))
+            return
+        self.after(30, self.poll_live_recognition)
+
     def mark_manual_attendance(self):
         name = self.student_var.get()
         student_info = student_database.get(name, {})
@@ -634,32 +1130,26 @@ class AttendancePage(tk.Frame):
             return
 
         # Check if this student has already been marked in this session
-        for record in attendance_records:
-            if record["name"] == name:
-                messagebox.showerror("Error", f"Attendance for {name} has already been marked.")
-                return
+        if session.is_marked(name):
+            messagebox.showerror("Error", f"Attendance for {name} has already been marked.")
+            return
 
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         record = {"name": name, "id": student_id, "status": status, "time": timestamp}
-        attendance_records.append(record)
+        session.mark(record)
 
         # Update attendance counts in database and UI - MODIFIED
         if name in student_database:
-            if status == "Absent":
-                student_database[name]["absences"] += 1
-                save_student_database(student_database)
-                self.absence_count.config(text=str(student_database[name]["absences"]))
-            elif status == "Present":
-                student_database[name]["presences"] += 1
-                save_student_database(student_database)
-                self.presence_count.config(text=str(student_database[name]["presences"]))
+            log_attendance(name, student_id, status, "manual")
                 
             # Update both counters to ensure UI consistency
             self.absence_count.config(text=str(student_database[name]["absences"]))
             self.presence_count.config(text=str(student_database[name]["presences"]))
         
         explanation = self.infer_consequence(name)
-        self.update_display()
+        self.append_attendance_record(record)
+        if name in student_database:
+            self.tree_update_student(name)
 
         message = f"Attendance marked for {name} as {status}."
         if explanation:
@@ -672,26 +1162,42 @@ class AttendancePage(tk.Frame):
             return ""
             
         absences = student_database[student_name]["absences"]
-        explanation = ""
-
-        for rule in reversed(rules):
-            if absences >= rule["threshold"]:
-                explanation = f"Rule Triggered: {rule['rule']}\nAction: {rule['consequence']}\nTotal Absences: {absences}"
-                break
-
-        return explanation
+        rule = rule_engine.rule_for(absences)
+        if rule is None:
+            return ""
+        return f"Rule Triggered: {rule['rule']}\nAction: {rule['consequence']}\nTotal Absences: {absences}"
         
     def update_display(self):
+        # Full redraw - only used to initialise the widget; marks use append_attendance_record
         self.attendance_display.delete("1.0", tk.END)
         header = "Time\t\t\tID\tName\t\tStatus\n" + "-"*216 + "\n"
         self.attendance_display.insert(tk.END, header)
         
         for record in attendance_records:
-            line = f"{record['time']}\t\t\t{record['id']}\t{record['name']}\t\t{record['status']}\n"
-            self.attendance_display.insert(tk.END, line)
+            self.append_attendance_record(record)
+
+    def append_attendance_record(self, record):
+        line = f"{record['time']}\t\t\t{record['id']}\t{record['name']}\t\t{record['status']}\n"
+        self.attendance_display.insert(tk.END, line)
+        self.attendance_display.see(tk.END)
 
 
 # Run the application
 if __name__ == "__main__":
-    app = IAESApp()
+    parser = argparse.ArgumentParser(description="Intelligent Attendance Evaluation System")
+    parser.add_argument("--measure-startup", action="store_true",
+                        help="Print time-to-interactive and model-ready time, then exit")
+    parser.add_argument("--backend", default="keras",
+                        help=f"Inference backend: {', '.join(BACKENDS)} or tflite:<path> (default: keras)")
+    parser.add_argument("--metrics-interval", type=float, default=None,
+                        help="Print a stage timing/counter line every N seconds")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    args = parser.parse_args()
+    model_backend = args.backend
+    if args.metrics_interval:
+        metrics.start_reporter(args.metrics_interval)
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    app = IAESApp(measure_startup=args.measure_startup)
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,272 @@
+import os
+import csv
+import sys
+import json
+import sqlite3
+import argparse
+from contextlib import contextmanager
+
+# === SQLite student store ===
+# Replaces the whole-file rewrite of student_database.json on every mark.
+# Rows are indexed by name (primary key) and id (unique), counters change
+# only through add_counters (compaction of the attendance event log), and
+# WAL mode keeps commits cheap and crash-safe. The JSON file is still
+# supported as an import/export format; large CSV/JSONL rosters are
+# streamed in validated chunks and committed in one transaction.
+
+DB_PATH = "student_database.db"
+JSON_PATH = "student_database.json"
+COUNTERS = ("absences", "presences")
+ROSTER_FIELDS = ("name", "id", "absences", "presences")
+IMPORT_CHUNK = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    name TEXT PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    absences INTEGER NOT NULL DEFAULT 0,
+    presences INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# === Streaming roster files (CSV / JSONL) ===
+def roster_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in (".csv", ".jsonl"):
+        raise ValueError(f"Unsupported roster format '{ext}' (use .csv or .jsonl)")
+    return ext[1:]
+
+def iter_roster(path):
+    # Yields (line_number, row dict) without reading the whole file into memory
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        if roster_format(path) == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"line {line_number}: invalid JSON ({e.msg})")
+
+def validate_roster(rows, names, ids, chunk_size=IMPORT_CHUNK):
+    # Yields lists of (name, id, absences, presences) tuples; names/ids are hash sets of
+    # everything already taken and grow as rows are accepted
+    chunk = []
+    for line_number, row in rows:
+        if not isinstance(row, dict):
+            raise ValueError(f"line {line_number}: expected an object with name and id")
+        name = str(row.get("name") or "").strip()
+        student_id = str(row.get("id") or "").strip()
+        if not name or not student_id:
+            raise ValueError(f"line {line_number}: name and id are required")
+        if name in names:
+            raise ValueError(f"line {line_number}: duplicate student name '{name}'")
+        if student_id in ids:
+            raise ValueError(f"line {line_number}: duplicate student ID '{student_id}'")
+        try:
+            counters = [int(row.get(counter) or 0) for counter in COUNTERS]
+        except (TypeError, ValueError):
+            raise ValueError(f"line {line_number}: absences and presences must be numbers")
+        if min(counters) < 0:
+            raise ValueError(f"line {line_number}: absences and presences must not be negative")
+        names.add(name)
+        ids.add(student_id)
+        chunk.append((name, student_id, *counters))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class StudentStore:
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self._batch_depth = 0
+
+    @classmethod
+    def open(cls, path=DB_PATH, json_path=JSON_PATH):
+        # First run: seed the database from the existing JSON file
+        created = not os.path.exists(path)
+        store = cls(path)
+        if created and os.path.exists(json_path):
+            try:
+                store.import_json(json_path)
+            except (json.JSONDecodeError, ValueError) as e:
+                print(f"❌ Error importing {json_path}:", str(e))
+        return store
+
+    def close(self):
+        self.conn.close()
+
+    def _commit(self):
+        if self._batch_depth == 0:
+            self.conn.commit()
+
+    @contextmanager
+    def batch(self, immediate=False):
+        # Groups several writes into one commit (e.g. all faces of a group photo).
+        # immediate=True takes the write lock up front, so reads inside the batch
+        # cannot be invalidated by another process writing before this commit.
+        if immediate and self._batch_depth == 0 and not self.conn.in_transaction:
+            self.conn.execute("BEGIN IMMEDIATE")
+        self._batch_depth += 1
+        try:
+            yield self
+        except Exception:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.conn.rollback()
+            raise
+        self._batch_depth -= 1
+        self._commit()
+
+    @staticmethod
+    def _row(row):
+        return {"id": row[1], "absences": row[2], "presences": row[3]}
+
+    def get(self, name):
+        row = self.conn.execute("SELECT * FROM students WHERE name = ?", (name,)).fetchone()
+        return self._row(row) if row else None
+
+    def load_all(self):
+        # {"Abir": {"id": "1", "absences": 4, "presences": 9}, ...} - same shape as the JSON file
+        return {row[0]: self._row(row) for row in self.conn.execute("SELECT * FROM students ORDER BY rowid")}
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+
+    def add(self, name, student_id, absences=0, presences=0):
+        try:
+            self.conn.execute(
+                "INSERT INTO students (name, id, absences, presences) VALUES (?, ?, ?, ?)",
+                (name, student_id, int(absences), int(presences))
+            )
+        except sqlite3.IntegrityError:
+            if self.get(name) is not None:
+                raise ValueError("Student name already exists in database")
+            raise ValueError("Student ID already exists in database")
+        self._commit()
+
+    def delete(self, name):
+        deleted = self.conn.execute("DELETE FROM students WHERE name = ?", (name,)).rowcount
+        self._commit()
+        return deleted > 0
+
+    def add_counters(self, deltas):
+        # deltas: {name: {"absences": n, "presences": m}}; unknown names are ignored
+        self.conn.executemany(
+            "UPDATE students SET absences = absences + ?, presences = presences + ? WHERE name = ?",
+            [(d.get("absences", 0), d.get("presences", 0), name) for name, d in deltas.items()]
+        )
+        self._commit()
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+        self._commit()
+
+    def import_json(self, json_path=JSON_PATH, replace=False):
+        with open(json_path, "r") as f:
+            db = json.load(f)
+        with self.batch():
+            if replace:
+                self.conn.execute("DELETE FROM students")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO students (name, id, absences, presences) VALUES (?, ?, ?, ?)",
+                [(name, str(info["id"]), int(info.get("absences", 0)), int(info.get("presences", 0)))
+                 for name, info in db.items()]
+            )
+        return len(db)
+
+    def import_roster(self, path, replace=False, chunk_size=IMPORT_CHUNK):
+        # Streams a CSV/JSONL roster in validated chunks inside one transaction: either
+        # every row is added or, on the first invalid/duplicate row, none are
+        roster_format(path)
+        with self.batch():
+            if replace:
+                self.conn.execute("DELETE FROM students")
+            names, ids = set(), set()
+            for name, student_id in self.conn.execute("SELECT name, id FROM students"):
+                names.add(name)
+                ids.add(student_id)
+            imported = 0
+            for chunk in validate_roster(iter_roster(path), names, ids, chunk_size):
+                self.conn.executemany(
+                    "INSERT INTO students (name, id, absences, presences) VALUES (?, ?, ?, ?)", chunk
+                )
+                imported += len(chunk)
+        return imported
+
+    def export_roster(self, path):
+        # Rows are streamed from the cursor; a temp file + swap keeps the old export on failure
+        fmt = roster_format(path)
+        tmp_path = path + ".tmp"
+        exported = 0
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f) if fmt == "csv" else None
+            if writer:
+                writer.writerow(ROSTER_FIELDS)
+            for row in self.conn.execute("SELECT name, id, absences, presences FROM students ORDER BY rowid"):
+                if writer:
+                    writer.writerow(row)
+                else:
+                    f.write(json.dumps(dict(zip(ROSTER_FIELDS, row))) + "\n")
+                exported += 1
+        os.replace(tmp_path, path)
+        return exported
+
+    def export_json(self, json_path=JSON_PATH):
+        # Write to a temp file and swap, so a crash never leaves a truncated JSON file
+        db = self.load_all()
+        tmp_path = json_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(db, f, indent=2)
+        os.replace(tmp_path, json_path)
+        return len(db)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import/export the SQLite student database.")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    import_cmd = sub.add_parser("import", help="Load students from a JSON, CSV or JSONL file")
+    import_cmd.add_argument("json_path", nargs="?", default=JSON_PATH)
+    import_cmd.add_argument("--replace", action="store_true", help="Drop existing students first")
+    export_cmd = sub.add_parser("export", help="Write students to a JSON, CSV or JSONL file")
+    export_cmd.add_argument("json_path", nargs="?", default=JSON_PATH)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = StudentStore(args.db)
+    try:
+        # .csv / .jsonl rosters are streamed; .json is the original whole-file format
+        is_json = args.json_path.lower().endswith(".json")
+        if args.command == "import":
+            load = store.import_json if is_json else store.import_roster
+            print(f"Imported {load(args.json_path, replace=args.replace)} student(s) into {args.db}")
+        else:
+            dump = store.export_json if is_json else store.export_roster
+            print(f"Exported {dump(args.json_path)} student(s) to {args.json_path}")
+    except (OSError, json.JSONDecodeError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
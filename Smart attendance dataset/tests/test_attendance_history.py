@@ -0,0 +1,31 @@
+from attendance_history import AttendanceHistory, term_report
+from attendance_log import AttendanceLog, make_event
+from rule_engine import RuleEngine
+
+RULES = [
+    {"threshold": 3, "consequence": "Warning"},
+    {"threshold": 5, "consequence": "Meeting with supervisor"},
+    {"threshold": 7, "consequence": "Disciplinary action"}
+]
+
+def write_log(path, marks):
+    log = AttendanceLog(str(path))
+    for name, status, timestamp in marks:
+        log.append(make_event(name, "1", status, "test", timestamp=timestamp))
+    log.close()
+
+def test_two_absences_on_one_day_keep_the_stored_total(tmp_path):
+    # Two sessions on 2024-03-01 both mark Abir absent: the UI counts both, so 7 are stored
+    log_path = tmp_path / "attendance_events.jsonl"
+    write_log(log_path, [("Abir", "Absent", "2024-03-01 09:00:00"),
+                         ("Abir", "Absent", "2024-03-01 14:00:00"),
+                         ("Abir", "Absent", "2024-03-02 09:00:00")])
+    history = AttendanceHistory()
+    history.update(str(log_path))
+    engine = RuleEngine(RULES)
+    roster = {"Abir": {"id": "1", "absences": 7}}
+
+    report = term_report(history, engine, roster=roster)
+    row = report["students"][0]
+    assert row["absent"] == 2  # one per day
+    assert row["consequence"] == engine.consequence(7) == "Disciplinary action"
@@ -0,0 +1,15 @@
+import pytest
+
+from student_store import StudentStore
+
+@pytest.mark.parametrize("line", ['[1, 2]', '"x"', '3', 'null'])
+def test_import_rejects_rows_that_are_not_objects(tmp_path, line):
+    roster = tmp_path / "roster.jsonl"
+    roster.write_text('{"name": "Abir", "id": "1"}\n' + line + "\n", encoding="utf-8")
+    store = StudentStore(str(tmp_path / "students.db"))
+    try:
+        with pytest.raises(ValueError, match="line 2"):
+            store.import_roster(str(roster))
+        assert store.count() == 0
+    finally:
+        store.close()
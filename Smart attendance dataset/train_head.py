@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+import numpy as np
+from embedding_index import build_feature_extractor, training_images
+from inference_backend import LABELS_PATH, MODEL_PATH, load_keras_model
+from prediction_cache import file_hash
+from preprocessing import BatchBuffer, preprocess_path
+
+# === Offline head retraining ===
+# Rebuilds keras_model.h5 / labels.txt from train/<Name>/ without Teachable
+# Machine. The MobileNet backbone of the existing model is frozen; its output
+# for every training image is cached on disk (memory-mapped .npy shards keyed
+# by the image's content hash), so adding a student or a few photos only runs
+# the backbone on the new files. Only the small dense head is trained.
+
+FEATURE_DIR = "feature_cache"
+
+def backbone_fingerprint(backbone):
+    # Cached features stay valid as long as the backbone weights are unchanged
+    digest = hashlib.blake2b(digest_size=16)
+    for weights in backbone.get_weights():
+        digest.update(np.ascontiguousarray(weights).tobytes())
+    return digest.hexdigest()
+
+class FeatureCache:
+    # index.json: {"backbone": fingerprint, "shards": [...], "rows": {file hash: [shard, row]}}
+    def __init__(self, directory=FEATURE_DIR, fingerprint=None):
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.json")
+        os.makedirs(directory, exist_ok=True)
+        index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+        if index.get("backbone") != fingerprint:
+            # Different backbone: start over
+            for shard in index.get("shards", []):
+                path = os.path.join(directory, shard)
+                if os.path.exists(path):
+                    os.remove(path)
+            index = {"backbone": fingerprint, "shards": [], "rows": {}}
+        self.index = index
+        self._shards = {}
+
+    def __contains__(self, key):
+        return key in self.index["rows"]
+
+    def _shard(self, number):
+        if number not in self._shards:
+            path = os.path.join(self.directory, self.index["shards"][number])
+            self._shards[number] = np.load(path, mmap_mode="r")
+        return self._shards[number]
+
+    def get_many(self, keys):
+        # N x D features straight from the memory-mapped shards
+        rows = [self.index["rows"][key] for key in keys]
+        return np.stack([self._shard(shard)[row] for shard, row in rows]) if rows else None
+
+    def add(self, keys, features):
+        # New features go into a fresh shard; existing shards are never rewritten
+        number = len(self.index["shards"])
+        name = f"features_{number:04d}.npy"
+        np.save(os.path.join(self.directory, name), np.asarray(features, dtype=np.float32))
+        self.index["shards"].append(name)
+        for row, key in enumerate(keys):
+            self.index["rows"][key] = [number, row]
+        self.save()
+
+    def save(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+def extract_features(backbone, cache, paths, batch_size=32, pack=None):
+    # Features for every path; only files not yet in the cache go through the backbone.
+    # With a PackedDataset, already decoded images are read from its mapped array.
+    keys = [file_hash(path) for path in paths]
+    missing = list(dict.fromkeys(key for key in keys if key not in cache))
+    if missing:
+        first_path = {}
+        for key, path in zip(keys, paths):
+            first_path.setdefault(key, path)
+        buffer = BatchBuffer(batch_size)
+        features = []
+        for start in range(0, len(missing), batch_size):
+            batch_keys = missing[start:start + batch_size]
+            for row, key in enumerate(batch_keys):
+                if pack is None or not pack.load_into(key, buffer.data[row]):
+                    preprocess_path(first_path[key], buffer.data[row], cache=None)
+            features.append(backbone.predict(buffer.view(len(batch_keys)), batch_size=len(batch_keys), verbose=0))
+        cache.add(missing, np.concatenate(features).reshape(len(missing), -1))
+    return cache.get_many(keys), len(missing)
+
+def read_labels(labels_path=LABELS_PATH):
+    if not os.path.exists(labels_path):
+        return []
+    with open(labels_path, "r") as f:
+        return [line.strip().split(" ", 1)[-1].strip() for line in f if line.strip()]
+
+def class_order(existing, students):
+    # Keep the current class indices stable; new students are appended
+    order = [name for name in existing if name in students]
+    return order + [name for name in sorted(students) if name not in order]
+
+def build_head(model, feature_size, num_classes):
+    # Same shape as the Teachable Machine head: Dense(hidden, relu) -> Dense(classes, softmax)
+    from keras.models import Sequential
+    from keras.layers import Dense, Input
+    hidden = 100
+    old_head = model.layers[-1]
+    dense = [layer for layer in getattr(old_head, "layers", []) if isinstance(layer, Dense)]
+    if len(dense) > 1:
+        hidden = dense[0].units
+    return Sequential([
+        Input(shape=(feature_size,)),
+        Dense(hidden, activation="relu"),
+        Dense(num_classes, activation="softmax", use_bias=False)
+    ])
+
+def train(args):
+    students = training_images(args.train_dir)
+    if len(students) < 2:
+        raise SystemExit(f"Error: need at least two student folders in {args.train_dir}.")
+    class_names = class_order(read_labels(args.labels), students)
+
+    started = time.perf_counter()
+    model = load_keras_model(args.model)
+    backbone = build_feature_extractor(model)
+    cache = FeatureCache(args.feature_dir, backbone_fingerprint(backbone))
+
+    paths, labels = [], []
+    for index, name in enumerate(class_names):
+        paths.extend(students[name])
+        labels.extend([index] * len(students[name]))
+    pack = None
+    if args.pack and os.path.exists(os.path.join(args.pack, "index.json")):
+        from packed_dataset import PackedDataset
+        pack = PackedDataset(args.pack)
+    features, extracted = extract_features(backbone, cache, paths, args.batch_size, pack)
+    labels = np.array(labels)
+    print(f"{len(paths)} image(s), {len(class_names)} student(s); backbone ran on {extracted} new image(s) "
+          f"({time.perf_counter() - started:.1f}s)")
+
+    from keras.models import Sequential
+    from keras.optimizers import Adam
+    head = build_head(model, features.shape[1], len(class_names))
+    head.compile(optimizer=Adam(learning_rate=args.learning_rate), loss="sparse_categorical_crossentropy",
+                 metrics=["accuracy"])
+    history = head.fit(features, labels, epochs=args.epochs, batch_size=args.train_batch_size,
+                       shuffle=True, verbose=0)
+    print(f"Head trained for {args.epochs} epoch(s): accuracy {history.history['accuracy'][-1]:.2%}, "
+          f"loss {history.history['loss'][-1]:.4f}")
+
+    backbone.trainable = False
+    new_model = Sequential([backbone, head])
+    new_model.build((None,) + tuple(model.input_shape[1:]))
+
+    # Write both files next to the originals first, then swap them in
+    tmp_model = args.output + ".tmp.h5"
+    new_model.save(tmp_model)
+    tmp_labels = args.labels + ".tmp"
+    with open(tmp_labels, "w") as f:
+        f.writelines(f"{index} {name}\n" for index, name in enumerate(class_names))
+    os.replace(tmp_model, args.output)
+    os.replace(tmp_labels, args.labels)
+    print(f"Wrote {args.output} and {args.labels} in {time.perf_counter() - started:.1f}s")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Retrain the classification head on train/<Name>/ photos.")
+    parser.add_argument("--train-dir", default="train")
+    parser.add_argument("--model", default=MODEL_PATH, help="Model whose backbone is reused")
+    parser.add_argument("--output", default=MODEL_PATH)
+    parser.add_argument("--labels", default=LABELS_PATH)
+    parser.add_argument("--feature-dir", default=FEATURE_DIR)
+    parser.add_argument("--pack", default="dataset_pack", help="Packed dataset to read decoded images from, if present")
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--learning-rate", type=float, default=0.001)
+    parser.add_argument("--train-batch-size", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=32, help="Images per backbone call")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    train(parse_args(argv))
+
+if __name__ == "__main__":
+    main()